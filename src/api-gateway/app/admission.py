@@ -0,0 +1,175 @@
+import math
+import time
+import asyncio
+from collections import OrderedDict
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.websockets import WebSocketClose
+
+DEFAULT_MAX_QUEUE = 0
+DEFAULT_QUEUE_TIMEOUT = 5.0
+DEFAULT_MAX_TRACKED_CLIENTS = 10_000
+DEFAULT_MAX_STREAMS = 100
+
+# RFC 6455 close code asking the client to reconnect later
+WS_TRY_AGAIN_LATER = 1013
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class Bulkhead:
+    """Caps in-flight requests to one service, with a bounded wait queue in front of it."""
+
+    def __init__(self, service: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.service = service
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        if self.semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected(503, f"{self.service} is at capacity", retry_after=1)
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+            except TimeoutError:
+                self.rejected += 1
+                raise AdmissionRejected(503, f"{self.service} is at capacity", retry_after=1)
+            finally:
+                self.waiting -= 1
+        else:
+            await self.semaphore.acquire()
+
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self.semaphore.release()
+
+class StreamLimit:
+    """Caps a service's open WebSocket and SSE connections, which would otherwise pin bulkhead slots for hours."""
+
+    def __init__(self, service: str, max_connections: int):
+        self.service = service
+        self.max_connections = max_connections
+        self.active = 0
+        self.rejected = 0
+
+    def acquire(self):
+        if self.active >= self.max_connections:
+            self.rejected += 1
+            raise AdmissionRejected(503, f"{self.service} has too many open streams", retry_after=5)
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+
+class RateLimiter:
+    """Token bucket per client IP; the least recently seen clients are forgotten first."""
+
+    def __init__(self, rps: float, burst: float, max_clients: int = DEFAULT_MAX_TRACKED_CLIENTS):
+        self.rps = rps
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.rejected = 0
+
+    def check(self, client_ip: str):
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.pop(client_ip, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rps)
+
+        if tokens < 1:
+            self.buckets[client_ip] = (tokens, now)
+            self.rejected += 1
+            raise AdmissionRejected(
+                429,
+                "Too many requests",
+                retry_after=math.ceil((1 - tokens) / self.rps),
+            )
+
+        self.buckets[client_ip] = (tokens - 1, now)
+        if len(self.buckets) > self.max_clients:
+            self.buckets.popitem(last=False)
+
+def build_bulkhead(service: str, config: dict) -> Bulkhead | None:
+    if "max_concurrency" not in config:
+        return None
+    return Bulkhead(
+        service,
+        max_concurrency=config["max_concurrency"],
+        max_queue=config.get("max_queue", DEFAULT_MAX_QUEUE),
+        queue_timeout=config.get("queue_timeout", DEFAULT_QUEUE_TIMEOUT),
+    )
+
+def build_stream_limit(service: str, config: dict) -> StreamLimit:
+    streams = config.get("streams", {})
+    return StreamLimit(service, max_connections=streams.get("max_connections", DEFAULT_MAX_STREAMS))
+
+def build_rate_limiter(config: dict) -> RateLimiter | None:
+    rate_limit = config.get("rate_limit")
+    if not rate_limit:
+        return None
+    return RateLimiter(rps=rate_limit["rps"], burst=rate_limit.get("burst", rate_limit["rps"]))
+
+def is_long_lived(scope) -> bool:
+    return scope["type"] == "websocket" or "text/event-stream" in Headers(scope=scope).get("accept", "")
+
+class AdmissionMiddleware:
+    """
+    Admits requests routed to an upstream through the service's rate limit and bulkhead,
+    or its stream limit for WebSocket and SSE connections.
+    Runs as ASGI middleware so a slot stays held until a streamed response finishes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        upstream = scope.get("state", {}).get("upstream")
+        if upstream is None:
+            await self.app(scope, receive, send)
+            return
+
+        long_lived = is_long_lived(scope)
+        slot = upstream.stream_limit if long_lived else upstream.bulkhead
+        if slot is None and upstream.rate_limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            if upstream.rate_limiter is not None:
+                client = scope.get("client")
+                upstream.rate_limiter.check(client[0] if client else "unknown")
+            if long_lived:
+                slot.acquire()
+            elif slot is not None:
+                await slot.acquire()
+        except AdmissionRejected as exc:
+            if scope["type"] == "websocket":
+                response = WebSocketClose(code=WS_TRY_AGAIN_LATER, reason=exc.detail)
+            else:
+                response = JSONResponse(
+                    status_code=exc.status_code,
+                    content={"detail": exc.detail},
+                    headers={"Retry-After": str(exc.retry_after)},
+                )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if slot is not None:
+                slot.release()
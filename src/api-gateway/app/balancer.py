@@ -0,0 +1,208 @@
+import time
+import socket
+import random
+import asyncio
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STRATEGY = "p2c"
+DEFAULT_HEALTH_PATH = "/health"
+DEFAULT_HEALTH_INTERVAL = 10.0
+DEFAULT_HEALTH_TIMEOUT = 2.0
+DEFAULT_UNHEALTHY_THRESHOLD = 2
+DEFAULT_EJECT_AFTER = 5
+DEFAULT_EJECTION_TIME = 30.0
+DEFAULT_MAX_EJECTION_PERCENT = 50
+DEFAULT_DISCOVERY_INTERVAL = 15.0
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = httpx.URL(url.rstrip("/"))
+        self.outstanding = 0
+        self.healthy = True
+        self.failed_checks = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and self.ejected_until <= now
+
+class LoadBalancer:
+    """
+    Picks an endpoint per upstream call and takes bad ones out of rotation,
+    both from active /health probes and from passive 5xx/timeout outlier detection.
+    """
+
+    def __init__(self, urls: list[str], config: dict | None = None):
+        config = config or {}
+        self.strategy = config.get("strategy", DEFAULT_STRATEGY)
+        if self.strategy not in {"p2c", "least_outstanding"}:
+            raise RuntimeError(f"Unknown balancer strategy {self.strategy}")
+
+        self.eject_after = config.get("eject_after", DEFAULT_EJECT_AFTER)
+        self.ejection_time = config.get("ejection_time", DEFAULT_EJECTION_TIME)
+        self.max_ejection_percent = config.get("max_ejection_percent", DEFAULT_MAX_EJECTION_PERCENT)
+        self.health_path = config.get("health_path", DEFAULT_HEALTH_PATH)
+        self.health_interval = config.get("health_interval", DEFAULT_HEALTH_INTERVAL)
+        self.health_timeout = config.get("health_timeout", DEFAULT_HEALTH_TIMEOUT)
+        self.unhealthy_threshold = config.get("unhealthy_threshold", DEFAULT_UNHEALTHY_THRESHOLD)
+        self.discover = config.get("discover")
+        self.discovery_interval = config.get("discovery_interval", DEFAULT_DISCOVERY_INTERVAL)
+
+        self.endpoints: list[Endpoint] = []
+        self.set_endpoints(urls)
+        self.tasks: list[asyncio.Task] = []
+
+    def set_endpoints(self, urls: list[str]):
+        """Replaces the endpoint set, keeping the state of endpoints that are still present."""
+        current = {str(endpoint.url): endpoint for endpoint in self.endpoints}
+        endpoints = []
+        for url in urls:
+            endpoint = Endpoint(url)
+            endpoints.append(current.get(str(endpoint.url), endpoint))
+        if endpoints:
+            self.endpoints = endpoints
+
+    def pick(self) -> Endpoint:
+        now = time.monotonic()
+        # When every endpoint looks bad, spreading load beats refusing it
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.available(now)] or self.endpoints
+
+        if len(candidates) == 1:
+            return candidates[0]
+
+        if self.strategy == "least_outstanding":
+            fewest = min(endpoint.outstanding for endpoint in candidates)
+            return random.choice([endpoint for endpoint in candidates if endpoint.outstanding == fewest])
+
+        first, second = random.sample(candidates, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+    def report(self, endpoint: Endpoint, ok: bool):
+        if ok:
+            endpoint.consecutive_failures = 0
+            return
+
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures < self.eject_after:
+            return
+
+        now = time.monotonic()
+        ejected = sum(1 for other in self.endpoints if other.ejected_until > now)
+        if (ejected + 1) * 100 > self.max_ejection_percent * len(self.endpoints):
+            return
+
+        endpoint.ejections += 1
+        endpoint.consecutive_failures = 0
+        endpoint.ejected_until = now + self.ejection_time * min(endpoint.ejections, 10)
+        logger.warning(f"Ejected {endpoint.url} for {endpoint.ejected_until - now:.0f}s")
+
+    def start(self):
+        self.tasks.append(asyncio.create_task(self._health_check_loop()))
+        if self.discover:
+            self.tasks.append(asyncio.create_task(self._discovery_loop()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+
+    async def _check(self, client: httpx.AsyncClient, endpoint: Endpoint):
+        try:
+            resp = await client.get(f"{endpoint.url}{self.health_path}")
+            ok = resp.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+
+        if ok:
+            endpoint.failed_checks = 0
+            endpoint.healthy = True
+            return
+
+        endpoint.failed_checks += 1
+        if endpoint.healthy and endpoint.failed_checks >= self.unhealthy_threshold:
+            endpoint.healthy = False
+            logger.warning(f"{endpoint.url} failed {endpoint.failed_checks} health checks")
+
+    async def _health_check_loop(self):
+        async with httpx.AsyncClient(timeout=self.health_timeout) as client:
+            while True:
+                await asyncio.gather(*(self._check(client, endpoint) for endpoint in self.endpoints))
+                await asyncio.sleep(self.health_interval)
+
+    async def _discovery_loop(self):
+        target = httpx.URL(self.discover)
+        port = target.port or (443 if target.scheme == "https" else 80)
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                infos = await loop.getaddrinfo(target.host, port, type=socket.SOCK_STREAM)
+                addresses = sorted({info[4][0] for info in infos})
+                self.set_endpoints([
+                    str(target.copy_with(host=address, port=port)) for address in addresses
+                ])
+            except OSError as exc:
+                logger.warning(f"Could not resolve {target.host}: {exc}")
+            await asyncio.sleep(self.discovery_interval)
+
+class _TrackedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+        self.failed = False
+        self.closed = False
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self.stream:
+                yield chunk
+        except httpx.TransportError:
+            self.failed = True
+            raise
+
+    async def aclose(self):
+        if not self.closed:
+            self.closed = True
+            self.on_close(self.failed)
+        await self.stream.aclose()
+
+class BalancingTransport(httpx.AsyncBaseTransport):
+    """Rewrites each request to the endpoint picked by the balancer and feeds the outcome back."""
+
+    def __init__(self, balancer: LoadBalancer, transport: httpx.AsyncBaseTransport):
+        self.balancer = balancer
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = self.balancer.pick()
+        request.url = request.url.copy_with(
+            scheme=endpoint.url.scheme,
+            host=endpoint.url.host,
+            port=endpoint.url.port,
+        )
+        request.headers["host"] = request.url.netloc.decode("ascii")
+
+        endpoint.outstanding += 1
+        try:
+            resp = await self.transport.handle_async_request(request)
+        except BaseException as exc:
+            endpoint.outstanding -= 1
+            if isinstance(exc, httpx.TransportError):
+                self.balancer.report(endpoint, ok=False)
+            raise
+
+        ok = resp.status_code < 500
+
+        def on_close(failed: bool):
+            endpoint.outstanding -= 1
+            self.balancer.report(endpoint, ok=ok and not failed)
+
+        resp.stream = _TrackedStream(resp.stream, on_close)
+        return resp
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,183 @@
+import math
+import time
+import random
+import asyncio
+import logging
+import httpx
+from app.metrics import UPSTREAM_LATENCY, status_class
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIME = 10.0
+DEFAULT_HALF_OPEN_MAX_CALLS = 1
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 0.05
+DEFAULT_BACKOFF_MAX = 1.0
+DEFAULT_BUDGET_RATIO = 0.2
+DEFAULT_BUDGET_MIN_PER_SECOND = 5.0
+
+class CircuitOpenError(Exception):
+    def __init__(self, service: str, retry_after: int):
+        super().__init__(f"Circuit for {service} is open")
+        self.service = service
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    def __init__(self, service: str, config: dict | None = None):
+        config = config or {}
+        self.service = service
+        self.failure_threshold = config.get("failure_threshold", DEFAULT_FAILURE_THRESHOLD)
+        self.recovery_time = config.get("recovery_time", DEFAULT_RECOVERY_TIME)
+        self.half_open_max_calls = config.get("half_open_max_calls", DEFAULT_HALF_OPEN_MAX_CALLS)
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.times_opened = 0
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.opened_at + self.recovery_time - time.monotonic()))
+
+    def before_call(self):
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_time:
+                raise CircuitOpenError(self.service, self.retry_after())
+            self.state = HALF_OPEN
+            self.half_open_calls = 0
+
+        if self.state == HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                raise CircuitOpenError(self.service, 1)
+            self.half_open_calls += 1
+
+    # Gives back the probe slot of a call that ended without an outcome, e.g. because it was cancelled
+    def release(self):
+        if self.state == HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def record(self, ok: bool):
+        if ok:
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.service} closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            return
+
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit for {self.service} opened after {self.consecutive_failures} failures")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        snapshot = {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+        }
+        if self.state == OPEN:
+            snapshot["retry_after"] = self.retry_after()
+        return snapshot
+
+class RetryBudget:
+    """
+    Token bucket that earns a fraction of a retry per request plus a small
+    per-second floor, so retries can never multiply the load on a struggling service.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max(10.0, min_per_second * 10)
+        self.tokens = self.max_tokens
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.updated_at) * self.min_per_second)
+        self.updated_at = now
+
+    def deposit(self):
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """Applies the service's circuit breaker and budgeted, jittered retries to every upstream call."""
+
+    def __init__(self, service: str, transport: httpx.AsyncBaseTransport, config: dict):
+        breaker_config = config.get("circuit_breaker", {})
+        retry_config = config.get("retries", {})
+
+        self.service = service
+        self.transport = transport
+        self.breaker = CircuitBreaker(service, breaker_config)
+        self.max_retries = retry_config.get("max_retries", DEFAULT_MAX_RETRIES)
+        self.backoff_base = retry_config.get("backoff_base", DEFAULT_BACKOFF_BASE)
+        self.backoff_max = retry_config.get("backoff_max", DEFAULT_BACKOFF_MAX)
+        self.budget = RetryBudget(
+            retry_config.get("budget_ratio", DEFAULT_BUDGET_RATIO),
+            retry_config.get("budget_min_per_second", DEFAULT_BUDGET_MIN_PER_SECOND),
+        )
+
+    def _can_retry(self, request: httpx.Request, attempt: int) -> bool:
+        return (
+            attempt < self.max_retries
+            and request.method in IDEMPOTENT_METHODS
+            # A streamed request body has already been consumed and can't be replayed
+            and isinstance(request.stream, httpx.ByteStream)
+            and self.budget.withdraw()
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            started = time.perf_counter()
+            try:
+                resp = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                UPSTREAM_LATENCY.labels(self.service, request.method, status_class(None)).observe(
+                    time.perf_counter() - started
+                )
+                self.breaker.record(ok=False)
+                if not self._can_retry(request, attempt):
+                    raise
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                UPSTREAM_LATENCY.labels(self.service, request.method, status_class(resp.status_code)).observe(
+                    time.perf_counter() - started
+                )
+                self.breaker.record(ok=resp.status_code < 500)
+                if resp.status_code not in RETRYABLE_STATUS_CODES or not self._can_retry(request, attempt):
+                    return resp
+                await resp.aclose()
+
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
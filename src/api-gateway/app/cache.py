@@ -0,0 +1,128 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+@dataclass(frozen=True)
+class CacheEntry:
+    status_code: int
+    headers: dict[str, str]
+    content: bytes
+    etag: str
+    stored_at: float
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    def age(self, now: float) -> int:
+        return int(now - self.stored_at)
+
+def cache_key(service: str, path: str, query_params) -> tuple:
+    return (service, path, tuple(sorted(query_params.multi_items())))
+
+def parse_cache_control(value: str | None) -> dict[str, str | None]:
+    directives = {}
+    if not value:
+        return directives
+
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+def make_etag(content: bytes) -> str:
+    return f'W/"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    return etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in candidates}
+
+def response_ttl(headers: dict[str, str], default_ttl: float) -> float:
+    """TTL for an upstream response; the service TTL is the ceiling, Cache-Control can only shorten it."""
+    lowered = {k.lower(): v for k, v in headers.items()}
+    if lowered.get("vary", "").lower() not in {"", "accept-encoding"}:
+        return 0
+
+    directives = parse_cache_control(lowered.get("cache-control"))
+    if {"no-store", "no-cache", "private"} & directives.keys():
+        return 0
+
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return min(default_ttl, max(int(directives[name] or 0), 0))
+            except ValueError:
+                return 0
+    return default_ttl
+
+class ResponseCache:
+    """In-process LRU of upstream responses, bounded by total body bytes."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_entry_bytes: int | None = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 4
+        self.entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> CacheEntry | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        key: tuple,
+        *,
+        status_code: int,
+        headers: dict[str, str],
+        content: bytes,
+        etag: str,
+        ttl: float,
+    ) -> CacheEntry | None:
+        if ttl <= 0 or len(content) > self.max_entry_bytes:
+            return None
+
+        now = time.monotonic()
+        entry = CacheEntry(
+            status_code=status_code,
+            headers=headers,
+            content=content,
+            etag=etag,
+            stored_at=now,
+            expires_at=now + ttl,
+        )
+
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = entry
+        self.size += entry.size
+
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+        return entry
+
+    def _remove(self, key: tuple):
+        entry = self.entries.pop(key)
+        self.size -= entry.size
@@ -0,0 +1,157 @@
+import os
+import gzip
+import zlib
+import zstandard
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Preferred first when the client weighs them equally
+SUPPORTED_ENCODINGS = ("zstd", "gzip")
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+)
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+def is_compressible(status_code: int, headers: Headers) -> bool:
+    if status_code < 200 or status_code in {204, 304}:
+        return False
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.split(";")[0].endswith(("+json", "+xml"))
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+class StreamCompressor:
+    """Incremental compressor that flushes every chunk, so streamed data reaches the client without waiting."""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self.sync_flush = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.sync_flush = zlib.Z_SYNC_FLUSH
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self.compressor.compress(data)
+        if final:
+            return out + self.compressor.flush()
+        return out + self.compressor.flush(self.sync_flush)
+
+class _CompressingSend:
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.passthrough = False
+        self.compressor = None
+
+    def _encode_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(scope=self.start)
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["etag"] = f"W/{etag}"
+        return headers
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = not is_compressible(message["status"], Headers(raw=message["headers"]))
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            content_length = Headers(raw=self.start["headers"]).get("content-length")
+            total = len(body) if not more_body else int(content_length) if content_length else None
+            if total is not None and total < self.minimum_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+
+            if not more_body:
+                compressed = await run_in_threadpool(compress, body, self.encoding)
+                headers = self._encode_headers()
+                headers["content-length"] = str(len(compressed))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            self.compressor = StreamCompressor(self.encoding)
+            headers = self._encode_headers()
+            del headers["content-length"]
+            await self.send(self.start)
+
+        chunk = await run_in_threadpool(self.compressor.compress, body, not more_body)
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+class CompressionMiddleware:
+    """
+    Compresses eligible responses with the best of zstd/gzip the client accepts.
+    Buffered bodies are compressed in one go and streamed bodies chunk by chunk,
+    both in the threadpool so the event loop keeps serving other requests.
+    """
+
+    def __init__(self, app, minimum_size: int | None = None):
+        self.app = app
+        self.minimum_size = minimum_size or int(os.getenv("COMPRESSION_MIN_SIZE", DEFAULT_MIN_SIZE))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        upstream = scope.get("state", {}).get("upstream")
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None or (upstream is not None and not upstream.compress):
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
@@ -2,7 +2,11 @@ import os
 import yaml
 from pathlib import Path
 
-CONFIG_PATH = Path("/config/services.yaml")
+CONFIG_PATH = Path(os.getenv("CONFIG_PATH", "/config/services.yaml"))
+
+def parse_services(raw: bytes) -> dict:
+    data = yaml.safe_load(raw) or {}
+    return data.get("services", {})
 
 def load_services() -> dict:
     if os.getenv("MODE") == "ci":
@@ -11,7 +15,4 @@ def load_services() -> dict:
     if not CONFIG_PATH.is_file():
         raise RuntimeError(f"{CONFIG_PATH} not found")
 
-    with CONFIG_PATH.open("r") as f:
-        data = yaml.safe_load(f) or {}
-
-    return data.get("services", {})
+    return parse_services(CONFIG_PATH.read_bytes())
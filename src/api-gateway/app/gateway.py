@@ -1,6 +1,12 @@
+import time
+import asyncio
 import httpx
+from collections import Counter
+from dataclasses import dataclass
 from fastapi import Request
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from app.cache import ResponseCache, etag_matches, make_etag, parse_cache_control, response_ttl
 
 HOP_BY_HOP_HEADERS = {
     "connection",
@@ -15,35 +21,232 @@ HOP_BY_HOP_HEADERS = {
     "content-encoding",
 }
 
-def sanitize_headers(headers):
+NOT_MODIFIED_HEADERS = {"etag", "cache-control", "vary", "age", "date", "expires", "x-cache"}
+
+# Raw upstream bytes are relayed untouched, so their encoding and length still hold
+STREAMING_HOP_BY_HOP_HEADERS = HOP_BY_HOP_HEADERS - {"content-length", "content-encoding"}
+
+def sanitize_headers(headers, drop=HOP_BY_HOP_HEADERS):
     return {
         k: v
         for k, v in headers.items()
-        if k.lower() not in HOP_BY_HOP_HEADERS
+        if k.lower() not in drop
     }
 
-async def forward_request(
+def has_request_body(request: Request) -> bool:
+    return "content-length" in request.headers or "transfer-encoding" in request.headers
+
+def is_cacheable_request(request: Request) -> bool:
+    # The cache key ignores credentials, so responses to them must never be shared
+    if request.method != "GET" or "authorization" in request.headers or "cookie" in request.headers:
+        return False
+    return "no-store" not in parse_cache_control(request.headers.get("cache-control"))
+
+def conditional_response(
+    request: Request,
     *,
+    status_code: int,
+    headers: dict[str, str],
+    content: bytes,
+    etag: str,
+) -> Response:
+    headers = {**headers, "etag": etag}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=304,
+            headers={k: v for k, v in headers.items() if k in NOT_MODIFIED_HEADERS},
+        )
+    return Response(content=content, status_code=status_code, headers=headers)
+
+@dataclass(frozen=True)
+class UpstreamResponse:
+    status_code: int
+    headers: dict[str, str]
+    content: bytes
+
+    def to_response(self) -> Response:
+        return Response(
+            content=self.content,
+            status_code=self.status_code,
+            headers=self.headers,
+        )
+
+class SingleFlight:
+    """Shares one in-flight upstream call between concurrent identical requests."""
+
+    def __init__(self):
+        self.calls: dict[tuple, asyncio.Task] = {}
+        self.leaders = Counter()
+        self.duplicates = Counter()
+
+    async def do(self, key: tuple, fetch):
+        task = self.calls.get(key)
+        if task is None:
+            # The call runs as its own task so a disconnecting leader can't cancel it for the others
+            task = asyncio.create_task(fetch())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.leaders[key[0]] += 1
+        else:
+            self.duplicates[key[0]] += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: tuple, task: asyncio.Task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            task.exception()
+
+async def fetch_upstream(
+    *,
+    client: httpx.AsyncClient,
     request: Request,
     target_url: str,
-) -> Response:
+) -> UpstreamResponse:
     outgoing_headers = {
         k: v
         for k, v in request.headers.items()
         if k.lower() not in {"host", "content-length"}
     }
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.request(
-            method=request.method,
-            url=target_url,
-            params=request.query_params,
-            headers=outgoing_headers,
-            content=await request.body(),
-        )
+    resp = await client.request(
+        method=request.method,
+        url=target_url,
+        params=request.query_params,
+        headers=outgoing_headers,
+        content=await request.body(),
+    )
 
-    return Response(
-        content=resp.content,
+    return UpstreamResponse(
         status_code=resp.status_code,
         headers=sanitize_headers(resp.headers),
+        content=resp.content,
+    )
+
+async def fetch_upstream_once(
+    *,
+    single_flight: SingleFlight | None,
+    key: tuple | None,
+    client: httpx.AsyncClient,
+    request: Request,
+    target_url: str,
+) -> UpstreamResponse:
+    async def fetch():
+        return await fetch_upstream(client=client, request=request, target_url=target_url)
+
+    if single_flight is None:
+        return await fetch()
+    return await single_flight.do(key, fetch)
+
+async def forward_request(
+    *,
+    client: httpx.AsyncClient,
+    request: Request,
+    target_url: str,
+    single_flight: SingleFlight | None = None,
+    key: tuple | None = None,
+) -> Response:
+    upstream_response = await fetch_upstream_once(
+        single_flight=single_flight,
+        key=key,
+        client=client,
+        request=request,
+        target_url=target_url,
+    )
+    return upstream_response.to_response()
+
+async def forward_cached_request(
+    *,
+    cache: ResponseCache,
+    key: tuple,
+    ttl: float,
+    client: httpx.AsyncClient,
+    request: Request,
+    target_url: str,
+    single_flight: SingleFlight | None = None,
+) -> Response:
+    directives = parse_cache_control(request.headers.get("cache-control"))
+    revalidate = "no-cache" in directives or directives.get("max-age") == "0"
+
+    entry = None if revalidate else cache.get(key)
+    if entry is not None:
+        return conditional_response(
+            request,
+            status_code=entry.status_code,
+            headers={**entry.headers, "age": str(entry.age(time.monotonic())), "x-cache": "HIT"},
+            content=entry.content,
+            etag=entry.etag,
+        )
+
+    upstream_response = await fetch_upstream_once(
+        single_flight=single_flight,
+        key=key,
+        client=client,
+        request=request,
+        target_url=target_url,
+    )
+    if upstream_response.status_code != 200:
+        return upstream_response.to_response()
+
+    etag = upstream_response.headers.get("etag") or make_etag(upstream_response.content)
+    cache.put(
+        key,
+        status_code=upstream_response.status_code,
+        headers=upstream_response.headers,
+        content=upstream_response.content,
+        etag=etag,
+        ttl=response_ttl(upstream_response.headers, ttl),
+    )
+    return conditional_response(
+        request,
+        status_code=upstream_response.status_code,
+        headers={**upstream_response.headers, "x-cache": "MISS"},
+        content=upstream_response.content,
+        etag=etag,
+    )
+
+async def forward_streaming_request(
+    *,
+    client: httpx.AsyncClient,
+    request: Request,
+    target_url: str,
+    idle_timeout: float | None = None,
+) -> StreamingResponse:
+    timeout = httpx.USE_CLIENT_DEFAULT
+    if idle_timeout is not None:
+        # Long-lived streams end after a silent stretch, never because they outlived the request timeout
+        timeout = httpx.Timeout(**{**client.timeout.as_dict(), "read": idle_timeout})
+
+    outgoing_headers = {
+        k: v
+        for k, v in request.headers.items()
+        if k.lower() not in {"host", "transfer-encoding"}
+    }
+
+    upstream_request = client.build_request(
+        method=request.method,
+        url=target_url,
+        params=request.query_params,
+        headers=outgoing_headers,
+        content=request.stream() if has_request_body(request) else None,
+        timeout=timeout,
+    )
+    resp = await client.send(upstream_request, stream=True)
+
+    async def relay():
+        try:
+            async for chunk in resp.aiter_raw():
+                yield chunk
+        except httpx.ReadTimeout:
+            if idle_timeout is None:
+                raise
+        finally:
+            await resp.aclose()
+
+    return StreamingResponse(
+        relay(),
+        status_code=resp.status_code,
+        headers=sanitize_headers(resp.headers, drop=STREAMING_HOP_BY_HOP_HEADERS),
+        background=BackgroundTask(resp.aclose),
     )
@@ -1,27 +1,163 @@
-from fastapi import FastAPI, Request, HTTPException
+import os
+import asyncio
+import httpx
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, HTTPException, WebSocket
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app.admission import AdmissionMiddleware, is_long_lived
+from app.breaker import CircuitOpenError
+from app.cache import DEFAULT_MAX_BYTES, ResponseCache, cache_key
+from app.compression import CompressionMiddleware
 from app.config import load_services
-from app.gateway import forward_request
+from app.gateway import (
+    SingleFlight,
+    forward_cached_request,
+    forward_request,
+    forward_streaming_request,
+    is_cacheable_request,
+)
+from app.metrics import REGISTRY, GatewayCollector, MetricsMiddleware
+from app.routing import RoutingMiddleware, RoutingTableWatcher, build_routing_table
+from app.websocket_proxy import proxy_websocket
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.routing = build_routing_table(load_services())
+    app.state.routing.start()
+    app.state.response_cache = ResponseCache(
+        max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    )
+    app.state.single_flight = SingleFlight()
+
+    watcher = RoutingTableWatcher(app)
+    watch = None if os.getenv("MODE") == "ci" else asyncio.create_task(watcher.run())
+    try:
+        yield
+    finally:
+        if watch is not None:
+            watch.cancel()
+        await watcher.stop()
+        await app.state.routing.aclose()
 
-app = FastAPI(title="API Gateway", redirect_slashes=False)
+app = FastAPI(title="API Gateway", redirect_slashes=False, lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RoutingMiddleware)
+REGISTRY.register(GatewayCollector(app))
 
-SERVICES = load_services()
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"{exc.service} is unavailable"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(httpx.TimeoutException)
+async def upstream_timeout_handler(request: Request, exc: httpx.TimeoutException):
+    return JSONResponse(status_code=504, content={"detail": "Upstream timed out"})
+
+@app.exception_handler(httpx.TransportError)
+async def upstream_error_handler(request: Request, exc: httpx.TransportError):
+    return JSONResponse(status_code=502, content={"detail": "Upstream unreachable"})
 
 @app.get("/health")
 def health():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/gateway/stats")
+def gateway_stats(request: Request):
+    cache = request.app.state.response_cache
+    single_flight = request.app.state.single_flight
+    return {
+        "cache": {
+            "entries": len(cache.entries),
+            "bytes": cache.size,
+            "hits": cache.hits,
+            "misses": cache.misses,
+        },
+        "coalescing": {
+            "in_flight": len(single_flight.calls),
+            "upstream_calls": dict(single_flight.leaders),
+            "coalesced_requests": dict(single_flight.duplicates),
+        },
+        "admission": {
+            name: {
+                "active": upstream.bulkhead.active,
+                "waiting": upstream.bulkhead.waiting,
+                "rejected": upstream.bulkhead.rejected,
+            }
+            for name, upstream in request.app.state.routing.upstreams.items()
+            if upstream.bulkhead is not None
+        },
+    }
+
+@app.get("/gateway/breakers")
+def gateway_breakers(request: Request):
+    return {
+        name: upstream.breaker.snapshot()
+        for name, upstream in request.app.state.routing.upstreams.items()
+    }
+
 @app.api_route(
     "/api/{service}/{path:path}",
     methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
 )
 async def api_gateway(service: str, path: str, request: Request):
-    if service not in SERVICES:
+    upstream = getattr(request.state, "upstream", None)
+    if upstream is None:
         raise HTTPException(status_code=404, detail="Unknown service")
 
-    base_url = SERVICES[service]["url"].rstrip("/")
-    target_url = f"{base_url}/{path}"
+    if is_long_lived(request.scope):
+        return await forward_streaming_request(
+            client=upstream.client,
+            request=request,
+            target_url=upstream.url_for(path),
+            idle_timeout=upstream.stream_idle_timeout,
+        )
+
+    # Coalesced callers share one response, so credentialed requests must each reach the upstream
+    coalesce = upstream.coalesce and is_cacheable_request(request)
+    single_flight = request.app.state.single_flight if coalesce else None
+    key = cache_key(service, path, request.query_params)
+
+    if upstream.cache_ttl > 0 and is_cacheable_request(request):
+        return await forward_cached_request(
+            cache=request.app.state.response_cache,
+            key=key,
+            ttl=upstream.cache_ttl,
+            client=upstream.client,
+            request=request,
+            target_url=upstream.url_for(path),
+            single_flight=single_flight,
+        )
+
+    if upstream.stream:
+        return await forward_streaming_request(
+            client=upstream.client,
+            request=request,
+            target_url=upstream.url_for(path),
+        )
 
     return await forward_request(
+        client=upstream.client,
         request=request,
-        target_url=target_url,
+        target_url=upstream.url_for(path),
+        single_flight=single_flight,
+        key=key,
     )
+
+@app.websocket("/api/{service}/{path:path}")
+async def api_gateway_websocket(websocket: WebSocket, service: str, path: str):
+    upstream = getattr(websocket.state, "upstream", None)
+    if upstream is None:
+        await websocket.close(code=1008, reason="Unknown service")
+        return
+
+    await proxy_websocket(websocket, upstream, path)
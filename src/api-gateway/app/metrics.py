@@ -0,0 +1,187 @@
+import time
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from app.admission import is_long_lived
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUESTS = Counter(
+    "gateway_requests",
+    "Requests proxied by the gateway",
+    ["service", "method", "status_class"],
+    registry=REGISTRY,
+)
+IN_FLIGHT = Gauge(
+    "gateway_requests_in_flight",
+    "Requests currently being proxied",
+    ["service", "method"],
+    registry=REGISTRY,
+)
+REQUEST_DURATION = Histogram(
+    "gateway_request_duration_seconds",
+    "Time from receiving a request to finishing its response, including queueing; WebSocket and SSE streams excluded",
+    ["service", "method", "status_class"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+UPSTREAM_LATENCY = Histogram(
+    "gateway_upstream_latency_seconds",
+    "Time until an upstream answered with response headers, per attempt",
+    ["service", "method", "status_class"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+REQUEST_BYTES = Counter(
+    "gateway_request_bytes",
+    "Request body bytes received from clients",
+    ["service"],
+    registry=REGISTRY,
+)
+RESPONSE_BYTES = Counter(
+    "gateway_response_bytes",
+    "Response body bytes sent to clients",
+    ["service"],
+    registry=REGISTRY,
+)
+
+def status_class(status_code: int | None) -> str:
+    return f"{status_code // 100}xx" if status_code else "error"
+
+class GatewayCollector:
+    """Reads pool, cache, coalescing, admission and breaker state at scrape time, so the hot path pays nothing for it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def collect(self):
+        state = self.app.state
+        routing = getattr(state, "routing", None)
+        if routing is None:
+            return
+
+        pool_connections = GaugeMetricFamily(
+            "gateway_pool_connections",
+            "Upstream connections held in the pool",
+            labels=["service", "state"],
+        )
+        pool_max = GaugeMetricFamily(
+            "gateway_pool_max_connections",
+            "Configured upstream connection limit",
+            labels=["service"],
+        )
+        breaker_open = GaugeMetricFamily(
+            "gateway_circuit_open",
+            "1 while the service's circuit breaker is open or half-open",
+            labels=["service"],
+        )
+        admission_waiting = GaugeMetricFamily(
+            "gateway_admission_waiting",
+            "Requests queued behind a service's bulkhead",
+            labels=["service"],
+        )
+        admission_rejected = CounterMetricFamily(
+            "gateway_admission_rejected",
+            "Requests turned away by a bulkhead or rate limit",
+            labels=["service", "reason"],
+        )
+        open_streams = GaugeMetricFamily(
+            "gateway_open_streams",
+            "WebSocket and SSE connections currently relayed",
+            labels=["service"],
+        )
+        coalesced = CounterMetricFamily(
+            "gateway_coalesced_requests",
+            "Requests answered from another request's in-flight upstream call",
+            labels=["service"],
+        )
+
+        for name, upstream in routing.upstreams.items():
+            active, idle, limit = upstream.pool_usage()
+            pool_connections.add_metric([name, "active"], active)
+            pool_connections.add_metric([name, "idle"], idle)
+            pool_max.add_metric([name], limit)
+            breaker_open.add_metric([name], 0 if upstream.breaker.state == "closed" else 1)
+            if upstream.bulkhead is not None:
+                admission_waiting.add_metric([name], upstream.bulkhead.waiting)
+                admission_rejected.add_metric([name, "capacity"], upstream.bulkhead.rejected)
+            if upstream.rate_limiter is not None:
+                admission_rejected.add_metric([name, "rate_limit"], upstream.rate_limiter.rejected)
+            open_streams.add_metric([name], upstream.stream_limit.active)
+            admission_rejected.add_metric([name, "streams"], upstream.stream_limit.rejected)
+
+        for name, count in state.single_flight.duplicates.items():
+            coalesced.add_metric([name], count)
+
+        cache = state.response_cache
+        lookups = cache.hits + cache.misses
+        yield CounterMetricFamily("gateway_cache_hits", "Response cache hits", value=cache.hits)
+        yield CounterMetricFamily("gateway_cache_misses", "Response cache misses", value=cache.misses)
+        yield GaugeMetricFamily(
+            "gateway_cache_hit_ratio",
+            "Response cache hits over lookups since start",
+            value=cache.hits / lookups if lookups else 0,
+        )
+        yield GaugeMetricFamily("gateway_cache_bytes", "Bytes held by the response cache", value=cache.size)
+
+        yield from (
+            pool_connections,
+            pool_max,
+            breaker_open,
+            admission_waiting,
+            admission_rejected,
+            open_streams,
+            coalesced,
+        )
+
+class MetricsMiddleware:
+    """Counts, times and sizes every request routed to an upstream."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        upstream = scope.get("state", {}).get("upstream")
+        if upstream is None:
+            await self.app(scope, receive, send)
+            return
+
+        service = upstream.name
+        method = scope.get("method", "WEBSOCKET")
+        long_lived = is_long_lived(scope)
+        status = None
+        received = 0
+        sent = 0
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "websocket.accept":
+                status = 101
+            elif message["type"] == "websocket.close" and status is None:
+                status = 403
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = IN_FLIGHT.labels(service, method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            in_flight.dec()
+            labels = (service, method, status_class(status))
+            REQUESTS.labels(*labels).inc()
+            if not long_lived:
+                REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - started)
+            REQUEST_BYTES.labels(service).inc(received)
+            RESPONSE_BYTES.labels(service).inc(sent)
@@ -0,0 +1,131 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from app.config import CONFIG_PATH, parse_services
+from app.upstream import Upstream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELOAD_INTERVAL = 5.0
+DEFAULT_DRAIN_TIMEOUT = 60.0
+
+@dataclass(frozen=True)
+class RoutingTable:
+    upstreams: MappingProxyType
+    digest: str = ""
+
+    def get(self, service: str) -> Upstream | None:
+        return self.upstreams.get(service)
+
+    def start(self):
+        for upstream in self.upstreams.values():
+            upstream.start()
+
+    async def aclose(self):
+        for upstream in self.upstreams.values():
+            await upstream.aclose()
+
+def build_routing_table(services: dict, digest: str = "", previous: RoutingTable | None = None) -> RoutingTable:
+    """Services whose settings are unchanged keep their Upstream, and with it their warm pool and breaker state."""
+    upstreams = {}
+    for name, config in services.items():
+        current = previous.get(name) if previous is not None else None
+        if current is not None and current.config == config:
+            upstreams[name] = current
+        else:
+            upstreams[name] = Upstream(name, config)
+    return RoutingTable(MappingProxyType(upstreams), digest)
+
+async def drain(upstreams: list[Upstream], timeout: float):
+    deadline = time.monotonic() + timeout
+    try:
+        while any(upstream.in_flight for upstream in upstreams) and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+    finally:
+        for upstream in upstreams:
+            if upstream.in_flight:
+                logger.warning(f"Closing {upstream.name} with {upstream.in_flight} requests still in flight")
+            await upstream.aclose()
+
+class RoutingTableWatcher:
+    """Polls the mounted services.yaml and atomically swaps in a new routing table when it changes."""
+
+    def __init__(self, app, path=CONFIG_PATH):
+        self.app = app
+        self.path = path
+        self.interval = float(os.getenv("CONFIG_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL))
+        self.drain_timeout = float(os.getenv("CONFIG_DRAIN_TIMEOUT", DEFAULT_DRAIN_TIMEOUT))
+        self.drains: set[asyncio.Task] = set()
+        self.invalid_digest = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                raw = await asyncio.to_thread(self.path.read_bytes)
+            except OSError as exc:
+                logger.warning(f"Could not read {self.path}: {exc}")
+                continue
+
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest not in {self.app.state.routing.digest, self.invalid_digest}:
+                self.reload(raw, digest)
+
+    def reload(self, raw: bytes, digest: str):
+        current = self.app.state.routing
+        try:
+            table = build_routing_table(parse_services(raw), digest, current)
+        except Exception:
+            logger.exception(f"Keeping the current routing table, {self.path} is invalid")
+            self.invalid_digest = digest
+            return
+
+        for name, upstream in table.upstreams.items():
+            if current.get(name) is not upstream:
+                upstream.start()
+        retired = [
+            upstream for name, upstream in current.upstreams.items()
+            if table.get(name) is not upstream
+        ]
+
+        # Requests already routed hold their own Upstream reference, so the swap never interrupts them
+        self.app.state.routing = table
+
+        if retired:
+            logger.info(f"Routing table reloaded, draining {[upstream.name for upstream in retired]}")
+            task = asyncio.create_task(drain(retired, self.drain_timeout))
+            self.drains.add(task)
+            task.add_done_callback(self.drains.discard)
+
+    async def stop(self):
+        drains = list(self.drains)
+        for task in drains:
+            task.cancel()
+        await asyncio.gather(*drains, return_exceptions=True)
+
+class RoutingMiddleware:
+    """Resolves /api/{service} against the current routing table once, for the whole life of the request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        upstream = None
+        if scope["type"] in {"http", "websocket"} and scope["path"].startswith("/api/"):
+            service = scope["path"].split("/", 3)[2]
+            upstream = scope["app"].state.routing.get(service)
+
+        if upstream is None:
+            await self.app(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["upstream"] = upstream
+        upstream.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            upstream.in_flight -= 1
@@ -0,0 +1,106 @@
+import httpx
+from app.admission import build_bulkhead, build_rate_limiter, build_stream_limit
+from app.balancer import BalancingTransport, LoadBalancer
+from app.breaker import ResilientTransport
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_STREAM_IDLE_TIMEOUT = 300.0
+
+def build_timeout(config) -> httpx.Timeout:
+    if config is None:
+        return httpx.Timeout(DEFAULT_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT)
+
+    if isinstance(config, (int, float)):
+        return httpx.Timeout(config)
+
+    default = config.get("default", DEFAULT_TIMEOUT)
+    return httpx.Timeout(
+        default,
+        connect=config.get("connect", DEFAULT_CONNECT_TIMEOUT),
+        read=config.get("read", default),
+        write=config.get("write", default),
+        pool=config.get("pool", default),
+    )
+
+def build_limits(config) -> httpx.Limits:
+    config = config or {}
+    return httpx.Limits(
+        max_connections=config.get("max_connections", DEFAULT_MAX_CONNECTIONS),
+        max_keepalive_connections=config.get(
+            "max_keepalive_connections", DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+        ),
+        keepalive_expiry=config.get("keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY),
+    )
+
+class Upstream:
+    """A service from services.yaml together with its long-lived connection pool."""
+
+    def __init__(self, name: str, config: dict):
+        self.name = name
+        self.config = config
+        balancer_config = config.get("balancer", {})
+        endpoints = config.get("endpoints") or []
+        # With a balancer this only supplies the path prefix; each call is re-addressed to the picked endpoint
+        url = config.get("url") or (endpoints[0] if endpoints else balancer_config.get("discover"))
+        if not url:
+            raise RuntimeError(f"Service {name} needs a url, endpoints or balancer.discover")
+        self.base_url = url.rstrip("/")
+        self.stream = bool(config.get("stream", False))
+        self.cache_ttl = float(config.get("cache_ttl", 0))
+        self.coalesce = bool(config.get("coalesce", True))
+        self.compress = bool(config.get("compress", True))
+        self.bulkhead = build_bulkhead(name, config)
+        self.rate_limiter = build_rate_limiter(config)
+        self.stream_limit = build_stream_limit(name, config)
+        self.stream_idle_timeout = float(
+            config.get("streams", {}).get("idle_timeout", DEFAULT_STREAM_IDLE_TIMEOUT)
+        )
+        self.in_flight = 0
+
+        self.limits = build_limits(config.get("pool"))
+        self.http_transport = httpx.AsyncHTTPTransport(
+            limits=self.limits,
+            http2=bool(config.get("http2", False)),
+        )
+        transport = self.http_transport
+
+        self.balancer = None
+        if endpoints or "discover" in balancer_config:
+            # A discovered service starts out on the service URL until its first DNS lookup
+            self.balancer = LoadBalancer(endpoints or [self.base_url], balancer_config)
+            transport = BalancingTransport(self.balancer, transport)
+
+        self.resilience = ResilientTransport(name, transport, config)
+        self.breaker = self.resilience.breaker
+
+        self.client = httpx.AsyncClient(
+            timeout=build_timeout(config.get("timeout")),
+            transport=self.resilience,
+        )
+
+    def url_for(self, path: str) -> str:
+        return f"{self.base_url}/{path}"
+
+    def pool_usage(self) -> tuple[int, int, int]:
+        # httpcore's pool is private; if its layout changes, fall back to the requests in flight,
+        # each of which holds a connection, and report no idle ones
+        pool = getattr(self.http_transport, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        try:
+            idle = sum(1 for connection in connections if connection.is_idle())
+        except (TypeError, AttributeError):
+            return self.in_flight, 0, self.limits.max_connections
+        return len(connections) - idle, idle, self.limits.max_connections
+
+    def start(self):
+        if self.balancer is not None:
+            self.balancer.start()
+
+    async def aclose(self):
+        if self.balancer is not None:
+            await self.balancer.stop()
+        await self.client.aclose()
@@ -0,0 +1,153 @@
+import time
+import asyncio
+import logging
+import httpx
+from fastapi import WebSocket
+from starlette.websockets import WebSocketState
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake, InvalidStatus
+from app.admission import WS_TRY_AGAIN_LATER
+from app.balancer import Endpoint
+from app.breaker import CircuitOpenError
+from app.gateway import HOP_BY_HOP_HEADERS, sanitize_headers
+from app.upstream import Upstream
+
+logger = logging.getLogger(__name__)
+
+# The upstream handshake is negotiated afresh, so the client's handshake headers must not leak into it
+HANDSHAKE_HEADERS = HOP_BY_HOP_HEADERS | {
+    "host",
+    "sec-websocket-key",
+    "sec-websocket-version",
+    "sec-websocket-extensions",
+    "sec-websocket-protocol",
+}
+
+# RFC 6455 close codes
+NORMAL_CLOSURE = 1000
+GOING_AWAY = 1001
+INTERNAL_ERROR = 1011
+# Reported when a peer vanished or closed without a code; never valid on the wire
+UNSENDABLE_CODES = {1005, 1006, 1015}
+
+def websocket_url(http_url: str) -> str:
+    return "ws" + http_url.removeprefix("http")
+
+def sendable(code: int | None) -> int:
+    return NORMAL_CLOSURE if code is None or code in UNSENDABLE_CODES else code
+
+def record(upstream: Upstream, endpoint: Endpoint | None, ok: bool):
+    upstream.breaker.record(ok=ok)
+    if endpoint is not None:
+        upstream.balancer.report(endpoint, ok=ok)
+
+async def connect_upstream(websocket: WebSocket, upstream: Upstream, path: str) -> ClientConnection | None:
+    url = httpx.URL(upstream.url_for(path))
+    endpoint = None
+    if upstream.balancer is not None:
+        # Same endpoint choice, health and ejection as HTTP calls through BalancingTransport
+        endpoint = upstream.balancer.pick()
+        url = url.copy_with(scheme=endpoint.url.scheme, host=endpoint.url.host, port=endpoint.url.port)
+    url = websocket_url(str(url))
+    if websocket.url.query:
+        url = f"{url}?{websocket.url.query}"
+
+    try:
+        upstream.breaker.before_call()
+    except CircuitOpenError:
+        return None
+
+    if endpoint is not None:
+        endpoint.outstanding += 1
+    try:
+        upstream_ws = await connect(
+            url,
+            additional_headers=sanitize_headers(websocket.headers, drop=HANDSHAKE_HEADERS),
+            subprotocols=websocket.scope.get("subprotocols") or None,
+            open_timeout=upstream.client.timeout.connect,
+            # Frames are relayed as-is; re-compressing them inside the cluster only burns CPU
+            compression=None,
+            max_size=None,
+        )
+    except InvalidStatus as exc:
+        record(upstream, endpoint, ok=exc.response.status_code < 500)
+        logger.info(f"{upstream.name} refused WebSocket upgrade for /{path}: {exc.response.status_code}")
+        return None
+    except (OSError, TimeoutError, InvalidHandshake) as exc:
+        record(upstream, endpoint, ok=False)
+        logger.warning(f"WebSocket connection to {upstream.name} failed: {exc!r}")
+        return None
+    except BaseException:
+        upstream.breaker.release()
+        raise
+    finally:
+        # Counts the handshake only; the session itself is bounded by the stream limit
+        if endpoint is not None:
+            endpoint.outstanding -= 1
+
+    record(upstream, endpoint, ok=True)
+    return upstream_ws
+
+async def proxy_websocket(websocket: WebSocket, upstream: Upstream, path: str):
+    """
+    Relays frames both ways between the client and the upstream until either side
+    closes, passing its close code on, or until no frame has moved for the idle timeout.
+    """
+    upstream_ws = await connect_upstream(websocket, upstream, path)
+    if upstream_ws is None:
+        await websocket.close(code=WS_TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept(subprotocol=upstream_ws.subprotocol)
+    last_activity = time.monotonic()
+
+    async def client_to_upstream():
+        nonlocal last_activity
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return message.get("code"), message.get("reason") or ""
+            last_activity = time.monotonic()
+            await upstream_ws.send(message["bytes"] if message.get("bytes") is not None else message["text"])
+
+    async def upstream_to_client():
+        nonlocal last_activity
+        try:
+            async for data in upstream_ws:
+                last_activity = time.monotonic()
+                if isinstance(data, bytes):
+                    await websocket.send_bytes(data)
+                else:
+                    await websocket.send_text(data)
+        except ConnectionClosed:
+            pass
+        return upstream_ws.close_code, upstream_ws.close_reason or ""
+
+    client_task = asyncio.create_task(client_to_upstream())
+    upstream_task = asyncio.create_task(upstream_to_client())
+    code, reason = GOING_AWAY, "Idle timeout"
+    try:
+        while True:
+            remaining = last_activity + upstream.stream_idle_timeout - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait(
+                {client_task, upstream_task},
+                timeout=remaining,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if done:
+                finished = client_task if client_task in done else upstream_task
+                if finished.exception() is None:
+                    code, reason = finished.result()
+                else:
+                    code, reason = INTERNAL_ERROR, ""
+                break
+    finally:
+        for task in (client_task, upstream_task):
+            task.cancel()
+        await asyncio.gather(client_task, upstream_task, return_exceptions=True)
+
+        await upstream_ws.close(sendable(code), reason)
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close(sendable(code), reason)
@@ -0,0 +1,220 @@
+"""
+Benchmarks the gateway's proxy path against local stub upstreams.
+
+Run from src/api-gateway:
+
+    uv run python -m benchmarks.run --concurrency 64 --duration 15 --output results.json
+    uv run python -m benchmarks.run --baseline baseline.json
+
+The gateway and the stub upstream each run in their own uvicorn process, so the
+gateway's CPU time and RSS are measured in isolation from the load generator.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+import httpx
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+# Each scenario is routed through a service of the same name, configured in gateway_services()
+SCENARIOS = {
+    "echo": "/api/echo/echo/hello",
+    "large": "/api/large/large?size=262144",
+    "large_cached": "/api/large_cached/large?size=262144",
+    "large_streamed": "/api/large_streamed/large?size=262144",
+    "slow": "/api/slow/slow?delay=0.05",
+}
+
+def gateway_services(upstream_url: str) -> dict:
+    return {
+        "echo": {"url": upstream_url, "coalesce": False},
+        "large": {"url": upstream_url, "coalesce": False, "compress": False},
+        "large_cached": {"url": upstream_url, "cache_ttl": 60, "compress": False},
+        "large_streamed": {"url": upstream_url, "stream": True, "compress": False},
+        "slow": {"url": upstream_url, "coalesce": False},
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(app: str, port: int, env: dict | None = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", app,
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--log-level", "warning",
+            "--no-access-log",
+        ],
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+    )
+
+def wait_healthy(url: str, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+def process_usage(pid: int) -> tuple[float, int]:
+    """CPU seconds and resident bytes of a process, read straight from /proc."""
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    rss_bytes = int(Path(f"/proc/{pid}/statm").read_text().split()[1]) * PAGE_SIZE
+    return cpu_seconds, rss_bytes
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+async def drive(client: httpx.AsyncClient, path: str, concurrency: int, duration: float) -> tuple[list[float], int]:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                resp = await client.get(path)
+                await resp.aread()
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+async def run_scenario(gateway_url: str, gateway_pid: int, path: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=gateway_url, limits=limits, timeout=30) as client:
+        if args.warmup:
+            await drive(client, path, args.concurrency, args.warmup)
+
+        cpu_before, _ = process_usage(gateway_pid)
+        started = time.perf_counter()
+        latencies, errors = await drive(client, path, args.concurrency, args.duration)
+        elapsed = time.perf_counter() - started
+        cpu_after, rss = process_usage(gateway_pid)
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "gateway_cpu_percent": round((cpu_after - cpu_before) / elapsed * 100, 1),
+        "gateway_rss_mb": round(rss / 2**20, 1),
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions beyond the tolerance: lower throughput, or higher latency or CPU."""
+    regressions = []
+    for scenario, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if previous is None:
+            continue
+
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{scenario}: rps {previous['rps']} -> {current['rps']}")
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "gateway_cpu_percent"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{scenario}: {metric} {previous[metric]} -> {current[metric]}")
+    return regressions
+
+def print_table(results: dict, baseline: dict | None):
+    columns = ("rps", "p50_ms", "p95_ms", "p99_ms", "gateway_cpu_percent", "gateway_rss_mb", "errors")
+    print(f"{'scenario':<16}" + "".join(f"{column:>22}" for column in columns), file=sys.stderr)
+    for scenario, current in results["scenarios"].items():
+        previous = (baseline or {}).get("scenarios", {}).get(scenario, {})
+        cells = []
+        for column in columns:
+            cell = str(current[column])
+            if previous.get(column):
+                cell += f" ({(current[column] - previous[column]) / previous[column]:+.0%})"
+            cells.append(f"{cell:>22}")
+        print(f"{scenario:<16}" + "".join(cells), file=sys.stderr)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of unmeasured load per scenario")
+    parser.add_argument("--output", type=Path, help="write the results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against the results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change treated as a regression")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    upstream_port = free_port()
+    gateway_port = free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    gateway_url = f"http://127.0.0.1:{gateway_port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "services.yaml"
+        config_path.write_text(yaml.safe_dump({"services": gateway_services(upstream_url)}))
+
+        upstream = start_server("benchmarks.stub_upstream:app", upstream_port)
+        gateway = start_server("app.main:app", gateway_port, env={"CONFIG_PATH": str(config_path)})
+        try:
+            wait_healthy(f"{upstream_url}/health")
+            wait_healthy(f"{gateway_url}/health")
+
+            results = {
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "scenarios": {},
+            }
+            for scenario in args.scenarios:
+                results["scenarios"][scenario] = asyncio.run(
+                    run_scenario(gateway_url, gateway.pid, SCENARIOS[scenario], args)
+                )
+        finally:
+            for process in (gateway, upstream):
+                process.terminate()
+                process.wait()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_table(results, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
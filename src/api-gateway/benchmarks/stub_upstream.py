@@ -0,0 +1,22 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.responses import Response
+
+app = FastAPI(title="benchmark-stub-upstream", redirect_slashes=False)
+
+@app.get("/health")
+def health():
+    return {"status": "up"}
+
+@app.get("/echo/{msg}")
+def echo(msg: str):
+    return {"message": msg}
+
+@app.get("/large")
+def large(size: int = 256 * 1024):
+    return Response(b'{"data":"' + b"x" * size + b'"}', media_type="application/json")
+
+@app.get("/slow")
+async def slow(delay: float = 0.05):
+    await asyncio.sleep(delay)
+    return {"delay": delay}
@@ -107,7 +107,9 @@ const demoMachines: Machine[] = [
     },
 ];
 
-type ActiveInferenceServerResponse = unknown[] | { deployments?: unknown };
+type ActiveInferenceServerResponse =
+    | unknown[]
+    | { deployments?: unknown; items?: unknown; next_cursor?: string | null };
 
 const extractString = (...candidates: unknown[]): string | null => {
     for (const candidate of candidates) {
@@ -134,6 +136,7 @@ const toActiveInferenceServerModelName = (item: unknown): string | null => {
             : null;
     const deploymentName = extractString(metadata?.name, record.name);
     const annotationModelName = extractString(
+        record.model_name,
         annotations?.["model-name"],
         annotations?.model_name
     );
@@ -183,18 +186,37 @@ export const fetchActiveInferenceServers = async (mode: ApiMode): Promise<Set<st
         return new Set<string>();
     }
 
-    const response = await withTimeout("/api/inference-gateway/inference/active-inference-servers");
+    const items: unknown[] = [];
+    let cursor: string | null = null;
 
-    if (!response.ok) {
-        throw new Error(await toApiErrorMessage(response, "Failed to load active inference servers"));
-    }
+    do {
+        const params = new URLSearchParams({ fields: "model_name", limit: "500" });
+        if (cursor) {
+            params.set("cursor", cursor);
+        }
+
+        const response = await withTimeout(
+            `/api/inference-gateway/inference/active-inference-servers?${params}`
+        );
+
+        if (!response.ok) {
+            throw new Error(await toApiErrorMessage(response, "Failed to load active inference servers"));
+        }
+
+        const data: ActiveInferenceServerResponse = await response.json();
+        if (Array.isArray(data)) {
+            items.push(...data);
+            break;
+        }
 
-    const data: ActiveInferenceServerResponse = await response.json();
-    const items = Array.isArray(data)
-        ? data
-        : Array.isArray((data as { deployments?: unknown }).deployments)
-            ? ((data as { deployments: unknown[] }).deployments as unknown[])
-            : [];
+        const page = Array.isArray(data.items)
+            ? data.items
+            : Array.isArray(data.deployments)
+                ? data.deployments
+                : [];
+        items.push(...page);
+        cursor = typeof data.next_cursor === "string" ? data.next_cursor : null;
+    } while (cursor);
 
     const modelNames = items
         .map(toActiveInferenceServerModelName)
@@ -0,0 +1,299 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Protocol
+import httpx
+import kr8s.asyncio
+from kr8s.asyncio.objects import Deployment
+from app.deployment_index import DeploymentIndex
+from app.logging_setup import logging_setup
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+MIN_REPLICAS_ANNOTATION = "inference-server/min-replicas"
+MAX_REPLICAS_ANNOTATION = "inference-server/max-replicas"
+
+AUTOSCALER_INTERVAL = float(os.getenv("AUTOSCALER_INTERVAL", 15))
+TARGET_UTILIZATION = float(os.getenv("AUTOSCALER_TARGET_UTILIZATION", 0.6))
+TOLERANCE = float(os.getenv("AUTOSCALER_TOLERANCE", 0.1))
+SCALE_DOWN_WINDOW = float(os.getenv("AUTOSCALER_SCALE_DOWN_WINDOW", 300))
+MAX_SCALE_UP_FACTOR = 2.0
+STATS_PORT = int(os.getenv("INFERENCE_SERVER_STATS_PORT", 80))
+STATS_TIMEOUT = 2.0
+
+@dataclass(frozen=True)
+class ScalingPolicy:
+    min_replicas: int
+    max_replicas: int
+    target_utilization: float = TARGET_UTILIZATION
+    tolerance: float = TOLERANCE
+
+    def clamp(self, replicas: int) -> int:
+        return max(self.min_replicas, min(self.max_replicas, replicas))
+
+def policy_for(deployment: dict) -> ScalingPolicy | None:
+    """
+    Read the replica bounds set by template_deployment.
+
+    Args:
+        deployment (dict): Raw Kubernetes Deployment manifest.
+
+    Returns:
+        ScalingPolicy | None: The bounds, or None if the Deployment is not autoscaled.
+    """
+    annotations = deployment["metadata"].get("annotations") or {}
+    try:
+        min_replicas = int(annotations[MIN_REPLICAS_ANNOTATION])
+        max_replicas = int(annotations[MAX_REPLICAS_ANNOTATION])
+    except (KeyError, ValueError):
+        return None
+    return ScalingPolicy(min_replicas, max(min_replicas, max_replicas))
+
+def replica_load(sample: dict, cpu_fraction: float | None = None) -> float:
+    """
+    Load of one replica as a fraction of its capacity; above 1.0 it can't keep up with PREDICTION_INTERVAL.
+
+    Args:
+        sample (dict): Stats reported by the inference server's /stats endpoint.
+        cpu_fraction (float, optional): Share of a CPU core used since the previous sample.
+
+    Returns:
+        float: The highest of busy time per interval, lag per interval and CPU share.
+    """
+    interval = sample["prediction_interval"]
+    signals = [sample["utilization"], sample["lag_seconds"] / interval]
+    if cpu_fraction is not None:
+        signals.append(cpu_fraction)
+    return max(signals)
+
+def recommend_replicas(current: int, loads: list[float], policy: ScalingPolicy) -> int:
+    """
+    Replicas needed to bring the average load back to the target.
+
+    Args:
+        current (int): Current spec.replicas.
+        loads (list[float]): Load of every replica that reported stats.
+        policy (ScalingPolicy): Bounds and target of the Deployment.
+
+    Returns:
+        int: Recommended replicas, unchanged while the load stays within the tolerance band.
+    """
+    if not loads:
+        return policy.clamp(current)
+
+    ratio = sum(loads) / len(loads) / policy.target_utilization
+    if abs(ratio - 1) <= policy.tolerance:
+        return policy.clamp(current)
+
+    desired = math.ceil(sum(loads) / policy.target_utilization)
+    if current > 0:
+        desired = min(desired, math.ceil(current * MAX_SCALE_UP_FACTOR))
+    return policy.clamp(desired)
+
+class KubeClient(Protocol):
+    async def list_deployments(self) -> list[dict]: ...
+    async def list_pod_ips(self, deployment: dict) -> dict[str, str]: ...
+    async def scale(self, name: str, replicas: int) -> None: ...
+
+class StatsClient(Protocol):
+    async def fetch(self, pod_ip: str) -> dict: ...
+
+class Kr8sKubeClient:
+    """KubeClient backed by the deployment index for reads and kr8s for pods and patches."""
+
+    def __init__(self, index: DeploymentIndex):
+        self.index = index
+
+    async def list_deployments(self) -> list[dict]:
+        if not await self.index.ready():
+            return []
+        return [deployment.raw for deployment in self.index.list()]
+
+    async def list_pod_ips(self, deployment: dict) -> dict[str, str]:
+        pods = kr8s.asyncio.get(
+            "pods",
+            namespace=self.index.namespace,
+            label_selector=deployment["spec"]["selector"]["matchLabels"],
+        )
+        return {
+            pod.name: pod.raw["status"]["podIP"]
+            async for pod in pods
+            if pod.raw.get("status", {}).get("phase") == "Running" and pod.raw["status"].get("podIP")
+        }
+
+    async def scale(self, name: str, replicas: int):
+        deployment = await Deployment(name, namespace=self.index.namespace)
+        await deployment.patch({"spec": {"replicas": replicas}})
+
+class HttpStatsClient:
+    def __init__(self, port: int = STATS_PORT):
+        self.port = port
+        self.client = httpx.AsyncClient(timeout=STATS_TIMEOUT)
+
+    async def fetch(self, pod_ip: str) -> dict:
+        resp = await self.client.get(f"http://{pod_ip}:{self.port}/stats")
+        resp.raise_for_status()
+        return resp.json()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class Autoscaler:
+    """
+    Control loop that sets spec.replicas of autoscaled inference servers from the load their replicas report.
+
+    Scaling up happens as soon as the load calls for it. Scaling down follows the highest
+    recommendation of the last SCALE_DOWN_WINDOW seconds, so a brief dip doesn't shed replicas
+    that the next peak needs.
+
+    Every replica runs all jobs of its Deployment, so extra replicas only help when the load
+    they report comes from something they share, such as the sensor service or MariaDB. Each
+    scale-out is therefore checked once all replicas report: if the average load didn't fall
+    by more than the tolerance, the Deployment is held at its replicas and not scaled up
+    again until its load drops back under the target.
+    """
+
+    def __init__(
+        self,
+        kube: KubeClient,
+        stats: StatsClient,
+        interval: float = AUTOSCALER_INTERVAL,
+        scale_down_window: float = SCALE_DOWN_WINDOW,
+        clock=time.monotonic,
+    ):
+        self.kube = kube
+        self.stats = stats
+        self.interval = interval
+        self.scale_down_window = scale_down_window
+        self.clock = clock
+        self.recommendations: dict[str, list[tuple[float, int]]] = {}
+        # Per deployment, the (cpu_seconds, uptime_seconds) each pod reported last
+        self.cpu_samples: dict[str, dict[str, tuple[float, float]]] = {}
+        # Per deployment, the replicas and average load before its last scale-out, until it is judged
+        self.scale_outs: dict[str, tuple[int, float]] = {}
+        # Deployments whose last scale-out didn't lower the load of their replicas
+        self.held: set[str] = set()
+
+    async def run(self):
+        while True:
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Autoscaler pass failed")
+            await asyncio.sleep(self.interval)
+
+    async def reconcile(self):
+        deployments = await self.kube.list_deployments()
+        managed = set()
+        for deployment in deployments:
+            policy = policy_for(deployment)
+            if policy is None:
+                continue
+            name = deployment["metadata"]["name"]
+            managed.add(name)
+            try:
+                await self.reconcile_deployment(deployment, policy)
+            except Exception:
+                logger.exception(f"Could not autoscale {name}")
+
+        for name in set(self.recommendations) - managed:
+            del self.recommendations[name]
+            self.cpu_samples.pop(name, None)
+            self.scale_outs.pop(name, None)
+            self.held.discard(name)
+
+    async def collect_loads(self, deployment: dict) -> list[float]:
+        pod_ips = await self.kube.list_pod_ips(deployment)
+        pod_names = list(pod_ips)
+        samples = await asyncio.gather(
+            *(self.stats.fetch(pod_ips[pod]) for pod in pod_names),
+            return_exceptions=True,
+        )
+
+        name = deployment["metadata"]["name"]
+        previous_samples = self.cpu_samples.get(name, {})
+        cpu_samples = {}
+        loads = []
+        for pod, sample in zip(pod_names, samples):
+            if isinstance(sample, Exception):
+                logger.debug(f"No stats from {pod}: {sample!r}")
+                continue
+
+            cpu_fraction = None
+            previous = previous_samples.get(pod)
+            if previous is not None and sample["uptime_seconds"] > previous[1]:
+                cpu_fraction = (sample["cpu_seconds"] - previous[0]) / (sample["uptime_seconds"] - previous[1])
+            cpu_samples[pod] = (sample["cpu_seconds"], sample["uptime_seconds"])
+            loads.append(replica_load(sample, cpu_fraction))
+
+        self.cpu_samples[name] = cpu_samples
+        return loads
+
+    def judge_scale_out(self, name: str, current: int, loads: list[float], policy: ScalingPolicy) -> bool:
+        """
+        Track whether the last scale-out of a Deployment lowered the load of its replicas.
+
+        Returns:
+            bool: Whether scaling up is allowed this pass.
+        """
+        average = sum(loads) / len(loads) if loads else 0.0
+        if name in self.held and average < policy.target_utilization:
+            logger.info(f"Load of {name} is back under the target, scaling it up again when needed")
+            self.held.discard(name)
+
+        scale_out = self.scale_outs.get(name)
+        if scale_out is None:
+            return name not in self.held
+        replicas_before, load_before = scale_out
+        if current <= replicas_before:
+            # Scaled back in meanwhile, e.g. by hand
+            del self.scale_outs[name]
+            return name not in self.held
+        if len(loads) < current:
+            # Not every new replica reports yet, so the scale-out can't be judged
+            return False
+
+        del self.scale_outs[name]
+        if average > load_before * (1 - policy.tolerance):
+            logger.warning(
+                f"Scaling {name} from {replicas_before} to {current} replicas left their load at "
+                f"{average:.2f} (was {load_before:.2f}), holding it at {current}"
+            )
+            self.held.add(name)
+            return False
+        return True
+
+    async def reconcile_deployment(self, deployment: dict, policy: ScalingPolicy):
+        name = deployment["metadata"]["name"]
+        current = deployment["spec"].get("replicas", 1)
+        loads = await self.collect_loads(deployment)
+        recommendation = recommend_replicas(current, loads, policy)
+        if not self.judge_scale_out(name, current, loads, policy):
+            recommendation = min(recommendation, current)
+
+        now = self.clock()
+        history = [
+            (at, replicas) for at, replicas in self.recommendations.get(name, [])
+            if now - at < self.scale_down_window
+        ]
+        history.append((now, recommendation))
+        self.recommendations[name] = history
+
+        if recommendation >= current:
+            target = recommendation
+        else:
+            target = min(current, max(replicas for _, replicas in history))
+        target = policy.clamp(target)
+        if target == current:
+            return
+
+        logger.info(f"Scaling {name} from {current} to {target} replicas, loads {[round(load, 2) for load in loads]}")
+        await self.kube.scale(name, target)
+        if target > current and loads:
+            self.scale_outs[name] = (current, sum(loads) / len(loads))
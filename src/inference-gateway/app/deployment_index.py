@@ -0,0 +1,230 @@
+import os
+import json
+import random
+import asyncio
+import logging
+import kr8s.asyncio
+from kr8s import ServerError
+from kr8s.asyncio.objects import Deployment
+from app.logging_setup import logging_setup
+from app.validation import inference_server_exists
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+RESYNC_INTERVAL = float(os.getenv("DEPLOYMENT_RESYNC_INTERVAL", 300))
+# Kept below RESYNC_INTERVAL so a quiet watch is renewed by the server rather than cut off by the resync
+WATCH_TIMEOUT = int(os.getenv("DEPLOYMENT_WATCH_TIMEOUT", 240))
+SYNC_WAIT_TIMEOUT = 5.0
+MIN_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+# Set by template_deployment; lets the API server do the filtering for both the list and the watch
+INFERENCE_SERVER_SELECTOR = "inference-server=true"
+# Servers created before the label existed only carry this annotation
+LEGACY_ANNOTATION = "inference-server"
+
+def legacy_labels(deployment: dict) -> dict[str, str] | None:
+    """
+    The labels missing from an inference server created before INFERENCE_SERVER_SELECTOR existed.
+
+    Args:
+        deployment (dict): Raw Kubernetes Deployment manifest.
+
+    Returns:
+        dict | None: The labels to add, or None if it is labelled already or isn't an inference server.
+    """
+    metadata = deployment["metadata"]
+    annotations = metadata.get("annotations") or {}
+    labels = metadata.get("labels") or {}
+    if annotations.get(LEGACY_ANNOTATION, "").lower() != "true" or labels.get("inference-server") == "true":
+        return None
+    missing = {"inference-server": "true"}
+    if "model-name" in annotations and "model-name" not in labels:
+        missing["model-name"] = annotations["model-name"]
+    return missing
+
+def server_name(model_name: str) -> str:
+    return f"{model_name.lower()}-inference-server"
+
+class ResourceVersionExpired(Exception):
+    pass
+
+class DeploymentIndex:
+    """
+    Informer-style, in-memory view of the Deployments labelled as inference servers in a namespace.
+
+    The index is seeded by a single list call and then kept current by a watch that resumes
+    from the last seen resourceVersion whenever the stream ends. It relists when that version
+    has expired (410 Gone) and every RESYNC_INTERVAL seconds in case an event was missed.
+
+    Before its first list, the index labels inference servers that only carry the older
+    annotation, so they stay visible to the label selector.
+    """
+
+    def __init__(self, namespace: str, resync_interval: float = RESYNC_INTERVAL):
+        self.namespace = namespace
+        self.resync_interval = resync_interval
+        self.deployments: dict[str, Deployment] = {}
+        self.resource_version = None
+        self.synced = asyncio.Event()
+        self.api = None
+        self.relabelled = False
+
+    def get(self, model_name: str) -> Deployment | None:
+        """
+        Look up the inference server of a model.
+
+        Args:
+            model_name (str): Name of the model served by the inference server.
+
+        Returns:
+            Deployment | None: The Deployment, or None if the model has no inference server.
+        """
+        return self.deployments.get(server_name(model_name))
+
+    def list(self) -> list[Deployment]:
+        """
+        List the inference server Deployments currently in the index.
+
+        Returns:
+            list: Kubernetes Deployment objects, sorted by name.
+        """
+        return [self.deployments[name] for name in sorted(self.deployments)]
+
+    async def ready(self) -> bool:
+        """
+        Wait briefly for the first list call to land.
+
+        Returns:
+            bool: True once the index can answer from memory.
+        """
+        try:
+            await asyncio.wait_for(self.synced.wait(), SYNC_WAIT_TIMEOUT)
+            return True
+        except TimeoutError:
+            return False
+
+    async def exists(self, model_name: str) -> bool:
+        """
+        Check whether a model already has an inference server, asking the API server
+        directly only while the index has not synced yet.
+
+        Args:
+            model_name (str): Name of the model served by the inference server.
+
+        Returns:
+            bool: True if the inference server Deployment exists.
+        """
+        if await self.ready():
+            return server_name(model_name) in self.deployments
+        return await inference_server_exists(model_name, self.namespace)
+
+    def apply(self, event_type: str, deployment: dict):
+        name = deployment["metadata"]["name"]
+        if event_type == "DELETED":
+            self.deployments.pop(name, None)
+        else:
+            self.deployments[name] = Deployment(deployment, api=self.api)
+
+    async def relabel_legacy(self):
+        """Label annotation-only inference servers; retried on the next relist until it succeeds."""
+        async with self.api.call_api(
+            "GET",
+            version="apps/v1",
+            namespace=self.namespace,
+            url="deployments",
+        ) as response:
+            deployment_list = response.json()
+
+        for deployment in deployment_list["items"]:
+            labels = legacy_labels(deployment)
+            if labels is not None:
+                await Deployment(deployment, api=self.api).patch({"metadata": {"labels": labels}})
+                logger.info(f"Labelled {deployment['metadata']['name']} as an inference server")
+        self.relabelled = True
+
+    async def relist(self):
+        async with self.api.call_api(
+            "GET",
+            version="apps/v1",
+            namespace=self.namespace,
+            url="deployments",
+            params={"labelSelector": INFERENCE_SERVER_SELECTOR},
+        ) as response:
+            deployment_list = response.json()
+
+        self.deployments = {
+            deployment["metadata"]["name"]: Deployment(deployment, api=self.api)
+            for deployment in deployment_list["items"]
+        }
+        self.resource_version = deployment_list["metadata"]["resourceVersion"]
+        self.synced.set()
+        logger.info(f"Indexed {len(self.deployments)} inference servers at resourceVersion {self.resource_version}")
+
+    async def watch(self):
+        params = {
+            "watch": "true",
+            "labelSelector": INFERENCE_SERVER_SELECTOR,
+            "resourceVersion": self.resource_version,
+            "allowWatchBookmarks": "true",
+            "timeoutSeconds": WATCH_TIMEOUT,
+        }
+        try:
+            async with self.api.call_api(
+                "GET",
+                version="apps/v1",
+                namespace=self.namespace,
+                url="deployments",
+                params=params,
+                stream=True,
+                timeout=None,
+            ) as response:
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    deployment = event["object"]
+                    if event["type"] == "ERROR":
+                        if deployment.get("code") == 410:
+                            raise ResourceVersionExpired()
+                        raise RuntimeError(deployment.get("message", "Watch failed"))
+
+                    self.resource_version = deployment["metadata"]["resourceVersion"]
+                    if event["type"] != "BOOKMARK":
+                        self.apply(event["type"], deployment)
+        except ServerError as exc:
+            if exc.response is not None and exc.response.status_code == 410:
+                raise ResourceVersionExpired() from exc
+            raise
+
+    async def run(self):
+        """Keeps the index current until cancelled, reconnecting with jittered backoff after errors."""
+        loop = asyncio.get_running_loop()
+        delay = MIN_RETRY_DELAY
+        while True:
+            try:
+                if self.api is None:
+                    self.api = await kr8s.asyncio.api()
+                if not self.relabelled:
+                    try:
+                        await self.relabel_legacy()
+                    except Exception as exc:
+                        logger.warning(f"Could not label older inference servers: {exc!r}")
+                await self.relist()
+                delay = MIN_RETRY_DELAY
+
+                resync_at = loop.time() + self.resync_interval
+                while (remaining := resync_at - loop.time()) > 0:
+                    # A watch ending on its own is routine, so it resumes without relisting
+                    await asyncio.wait_for(self.watch(), remaining)
+            except TimeoutError:
+                logger.debug("Resyncing inference server index")
+            except ResourceVersionExpired:
+                logger.info(f"resourceVersion {self.resource_version} expired, relisting inference servers")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Inference server watch failed, retrying in {delay:.0f}s: {exc!r}")
+                await asyncio.sleep(random.uniform(delay / 2, delay))
+                delay = min(MAX_RETRY_DELAY, delay * 2)
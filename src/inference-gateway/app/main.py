@@ -1,15 +1,51 @@
+import asyncio
 import logging
-import kr8s.asyncio
-from fastapi import FastAPI
-from app.validation import CreateServer, DeleteServer, model_is_on_mlflow, inference_server_exists
-from app.resource_templates import template_deployment
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
+from app.validation import (
+    CreateServer,
+    DeleteServer,
+    ScaleServer,
+    BulkCreateServers,
+    BulkScaleServers,
+    BulkDeleteServers,
+    AssignModels,
+    UnassignModels,
+)
+from app.servers import (
+    SERVER_FIELDS,
+    deployment_index,
+    list_inference_servers,
+    project_server,
+    encode_cursor,
+    decode_cursor,
+    create_inference_server,
+    scale_inference_server,
+    delete_inference_server,
+    run_bulk,
+)
+from app.pools import assign_models, unassign_models, rebalance_pools, list_pools, project_pool
+from app.autoscaler import Autoscaler, Kr8sKubeClient, HttpStatsClient
 from app.logging_setup import logging_setup
 
 logging_setup()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Inference Gateway", redirect_slashes=False)
-NAMESPACE = "model-pipeline"
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stats_client = HttpStatsClient()
+    autoscaler = Autoscaler(Kr8sKubeClient(deployment_index), stats_client)
+    tasks = [
+        asyncio.create_task(deployment_index.run()),
+        asyncio.create_task(autoscaler.run()),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await stats_client.aclose()
+
+app = FastAPI(title="Inference Gateway", redirect_slashes=False, lifespan=lifespan)
 
 @app.post("/inference/create-server")
 async def create_server(server: CreateServer):
@@ -21,6 +57,8 @@ async def create_server(server: CreateServer):
             model_name (str): Name of the registered MLflow model.
             replicas (int): Number of deployment replicas.
             prediction_interval (int): Interval between predictions.
+            min_replicas (int, optional): Lowest replicas the autoscaler may scale down to.
+            max_replicas (int, optional): Highest replicas the autoscaler may scale up to.
 
     Returns:
         dict: A dictionary containing:
@@ -31,10 +69,8 @@ async def create_server(server: CreateServer):
     """
     logger.info(f"Model Name: {server.model_name}, Replicas: {server.replicas}, Prediction Interval: {server.prediction_interval}")
 
-    if model_is_on_mlflow(server.model_name) and await inference_server_exists(server.model_name, NAMESPACE) is False:
-        deployment = template_deployment(server.model_name.lower(), server.replicas, server.prediction_interval)
-        deployment.create()
-
+    outcome = await create_inference_server(server)
+    if outcome["ok"]:
         return {
             "message": "Created deployment with the following parameters",
             "Model Name": server.model_name,
@@ -45,6 +81,60 @@ async def create_server(server: CreateServer):
     else:
         return {"message": "Can't create server, conditions not fulfilled"}
 
+@app.post("/inference/create-servers")
+async def create_servers(servers: BulkCreateServers):
+    """
+    Creates inference server Deployments for many models at once, with a bounded number of
+    MLflow and Kubernetes calls in flight.
+
+    Args:
+        servers (BulkCreateServers): Request body containing:
+            servers (list[CreateServer]): Model name, replicas and prediction interval per server.
+
+    Returns:
+        dict: A dictionary containing:
+            - results (list): Per-model result with model_name, status (created, exists, pooled, not_on_mlflow, failed), ok and the pool in detail when pooled.
+            - succeeded (int): Number of servers created.
+            - failed (int): Number of servers not created.
+    """
+    logger.info(f"Creating {len(servers.servers)} inference servers")
+    return await run_bulk(create_inference_server, servers.servers)
+
+@app.post("/inference/scale-server")
+async def scale_server(server: ScaleServer):
+    """
+    Patches the replicas and/or prediction interval of an existing Inference Server Deployment in place.
+
+    Args:
+        server (ScaleServer): Request body containing:
+            model_name (str): Name of the model whose inference server should change.
+            replicas (int, optional): New number of deployment replicas.
+            prediction_interval (int, optional): New interval between predictions.
+
+    Returns:
+        dict: Result with model_name, status (scaled, not_found, failed) and ok.
+    """
+    logger.info(f"Model Name: {server.model_name}, Replicas: {server.replicas}, Prediction Interval: {server.prediction_interval}")
+    return await scale_inference_server(server)
+
+@app.post("/inference/scale-servers")
+async def scale_servers(servers: BulkScaleServers):
+    """
+    Patches the replicas and/or prediction interval of many Inference Server Deployments at once.
+
+    Args:
+        servers (BulkScaleServers): Request body containing:
+            servers (list[ScaleServer]): Model name with the new replicas and/or prediction interval.
+
+    Returns:
+        dict: A dictionary containing:
+            - results (list): Per-model result with model_name, status (scaled, not_found, failed) and ok.
+            - succeeded (int): Number of servers changed.
+            - failed (int): Number of servers left unchanged.
+    """
+    logger.info(f"Scaling {len(servers.servers)} inference servers")
+    return await run_bulk(scale_inference_server, servers.servers)
+
 @app.post("/inference/delete-server")
 async def delete_server(server: DeleteServer):
     """
@@ -59,27 +149,134 @@ async def delete_server(server: DeleteServer):
             message (str): Confirmation message indicating which deployment was deleted.
     """
     logger.info(server.model_name)
+    await delete_inference_server(server.model_name)
 
-    async for deploy in kr8s.asyncio.get("deployment", f"{server.model_name.lower()}-inference-server", namespace=NAMESPACE):
-        logger.info(f"Deployment: {deploy}")
-        await deploy.delete()
-    
     return {"message": f"Deleted {server.model_name.lower()}-inference-server"}
 
+@app.post("/inference/delete-servers")
+async def delete_servers(servers: BulkDeleteServers):
+    """
+    Deletes the Inference Server Deployments of many models at once.
+
+    Args:
+        servers (BulkDeleteServers): Request body containing:
+            servers (list[DeleteServer]): Names of the models whose inference servers should be deleted.
+
+    Returns:
+        dict: A dictionary containing:
+            - results (list): Per-model result with model_name, status (deleted, not_found, failed) and ok.
+            - succeeded (int): Number of servers deleted.
+            - failed (int): Number of servers not deleted.
+    """
+    logger.info(f"Deleting {len(servers.servers)} inference servers")
+    return await run_bulk(lambda server: delete_inference_server(server.model_name), servers.servers)
+
 @app.get("/inference/active-inference-servers")
-async def get_inference_servers():
+async def get_inference_servers(
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = None,
+    fields: str | None = None,
+):
     """
-    Retrieves all active inference server deployments.
+    Retrieves a page of active inference servers, projected to a compact schema.
+
+    Args:
+        limit (int): Maximum number of servers per page.
+        cursor (str, optional): next_cursor of the previous page.
+        fields (str, optional): Comma separated subset of model_name, replicas,
+            ready_replicas, prediction_interval and image_tag. Defaults to all of them.
+
+    Returns:
+        dict: A dictionary containing:
+            - items (list): One dictionary per inference server with the selected fields, ordered by name.
+            - next_cursor (str): Cursor of the next page, or None on the last page.
+    """
+    selected = SERVER_FIELDS
+    if fields:
+        selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+        unknown = set(selected) - set(SERVER_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    deployments = await list_inference_servers()
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        deployments = [deploy for deploy in deployments if deploy.name > after]
+
+    page = deployments[:limit]
+    items = []
+    for deploy in page:
+        server = project_server(deploy)
+        items.append({field: server[field] for field in selected})
+
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(page[-1].name) if len(deployments) > limit else None,
+    }
+
+@app.post("/inference/pools/assign")
+async def assign_to_pools(request: AssignModels):
+    """
+    Packs models into shared pool Deployments, where one inference server process serves up to
+    POOL_CAPACITY models with the same prediction interval.
+
+    Args:
+        request (AssignModels): Request body containing:
+            model_names (list[str]): Names of the registered MLflow models.
+            prediction_interval (int): Interval between predictions.
+
+    Returns:
+        dict: A dictionary containing:
+            - results (list): Per-model result with model_name, status (assigned, pooled, dedicated, not_on_mlflow, failed), ok and the pool in detail.
+            - succeeded (int): Number of models assigned.
+            - failed (int): Number of models not assigned.
+    """
+    logger.info(f"Assigning {len(request.model_names)} models to pools, Prediction Interval: {request.prediction_interval}")
+    return await assign_models(request.model_names, request.prediction_interval)
+
+@app.post("/inference/pools/unassign")
+async def unassign_from_pools(request: UnassignModels):
+    """
+    Stops serving models from their pools, deleting pools left without models.
+
+    Args:
+        request (UnassignModels): Request body containing:
+            model_names (list[str]): Names of the models to remove.
 
     Returns:
-        list: A list of Kubernetes deployment objects currently active in the namespace.
+        dict: A dictionary containing:
+            - results (list): Per-model result with model_name, status (unassigned, not_pooled) and ok.
+            - succeeded (int): Number of models removed.
+            - failed (int): Number of models that were not in a pool.
+    """
+    logger.info(f"Unassigning {len(request.model_names)} models from pools")
+    return await unassign_models(request.model_names)
+
+@app.post("/inference/pools/rebalance")
+async def rebalance():
     """
-    deploy_list = []
-    async for deploy in kr8s.asyncio.get("deployments", namespace=NAMESPACE):
-        logger.info(f"Deployment: {deploy}")
-        deploy_list.append(deploy)
+    Spreads pooled models evenly over the fewest pools that hold them, deleting the pools no longer needed.
 
-    return deploy_list
+    Returns:
+        dict: A dictionary containing:
+            - pools (dict): Models of each remaining pool, by pool name.
+    """
+    return {"pools": await rebalance_pools()}
+
+@app.get("/inference/pools")
+async def get_pools():
+    """
+    Retrieves the pool Deployments and the models each one serves.
+
+    Returns:
+        dict: A dictionary containing:
+            - pools (list): One dictionary per pool with name, prediction_interval, ready_replicas and models.
+    """
+    pools = await list_pools()
+    return {"pools": [project_pool(pools[name]) for name in sorted(pools)]}
 
 @app.get("/inference/health")
 def health() -> dict[str, str]:
@@ -0,0 +1,285 @@
+import os
+import math
+import asyncio
+import logging
+import kr8s.asyncio
+from kr8s.asyncio.objects import Deployment
+from app.resource_templates import template_pool_deployment
+from app.servers import NAMESPACE, deployment_index, result, error_detail
+from app.validation import model_is_on_mlflow
+from app.logging_setup import logging_setup
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+POOL_CAPACITY = int(os.getenv("POOL_CAPACITY", 50))
+POOL_SELECTOR = "inference-pool=true"
+
+# Serializes pool changes within this gateway; other replicas are caught by the patch test and 409s
+pool_lock = asyncio.Lock()
+
+def pool_name(prediction_interval: int, index: int) -> str:
+    return f"inference-pool-{prediction_interval}s-{index}"
+
+def pool_models(deployment: Deployment) -> list[str]:
+    """
+    Read the models a pool Deployment serves.
+
+    Args:
+        deployment (Deployment): Pool Deployment.
+
+    Returns:
+        list[str]: Model names as registered in MLflow, in MODEL_NAMES order.
+    """
+    env = deployment.raw["spec"]["template"]["spec"]["containers"][0].get("env", [])
+    value = next((var.get("value", "") for var in env if var["name"] == "MODEL_NAMES"), "")
+    return [name.strip().capitalize() for name in value.split(",") if name.strip()]
+
+def pool_interval(deployment: Deployment) -> int:
+    return int(deployment.raw["metadata"]["labels"]["prediction-interval"])
+
+def new_pool_names(pools: dict[str, list[str]], prediction_interval: int):
+    index = 0
+    while True:
+        name = pool_name(prediction_interval, index)
+        if name not in pools:
+            yield name
+        index += 1
+
+def plan_assign(pools: dict[str, list[str]], model_names: list[str], prediction_interval: int, capacity: int = POOL_CAPACITY) -> dict[str, list[str]]:
+    """
+    Place models into the emptiest pools with room, opening new pools once all of them are full.
+
+    Args:
+        pools (dict): Models of each existing pool with this prediction interval, by pool name.
+        model_names (list[str]): Models to place; none of them may already be in a pool.
+        prediction_interval (int): Prediction interval shared by the pools.
+        capacity (int): Most models one pool serves.
+
+    Returns:
+        dict: Models of each pool after the placement, by pool name.
+    """
+    plan = {name: list(models) for name, models in pools.items()}
+    names = new_pool_names(plan, prediction_interval)
+    for model_name in model_names:
+        open_pools = [name for name, models in plan.items() if len(models) < capacity]
+        if open_pools:
+            target = min(open_pools, key=lambda name: (len(plan[name]), name))
+        else:
+            target = next(names)
+            plan[target] = []
+        plan[target].append(model_name)
+    return plan
+
+def plan_rebalance(pools: dict[str, list[str]], capacity: int = POOL_CAPACITY) -> dict[str, list[str]]:
+    """
+    Spread the models evenly over the fewest pools that can hold them, moving as few models as possible.
+
+    Args:
+        pools (dict): Models of each pool with the same prediction interval, by pool name.
+        capacity (int): Most models one pool serves.
+
+    Returns:
+        dict: Models of each pool after rebalancing; pools that end up empty map to an empty list.
+    """
+    total = sum(len(models) for models in pools.values())
+    count = math.ceil(total / capacity)
+    # The fullest pools are kept, so most models stay where they are
+    ranked = sorted(pools, key=lambda name: (-len(pools[name]), name))
+    kept, dropped = ranked[:count], ranked[count:]
+
+    plan = {name: [] for name in dropped}
+    spill = [model for name in dropped for model in pools[name]]
+    targets = {}
+    for position, name in enumerate(kept):
+        targets[name] = total // count + (1 if position < total % count else 0)
+        plan[name] = list(pools[name][:targets[name]])
+        spill.extend(pools[name][targets[name]:])
+
+    for name in kept:
+        while len(plan[name]) < targets[name]:
+            plan[name].append(spill.pop())
+    return plan
+
+async def list_pools() -> dict[str, Deployment]:
+    """
+    List the pool Deployments straight from the API server; there are few enough not to index them.
+
+    Returns:
+        dict: Pool Deployments by name.
+    """
+    return {
+        deploy.name: deploy async for deploy in kr8s.asyncio.get(
+            "deployments",
+            namespace=NAMESPACE,
+            label_selector=POOL_SELECTOR,
+        )
+    }
+
+async def pool_of(model_name: str) -> str | None:
+    """
+    Find the pool that serves a model.
+
+    Args:
+        model_name (str): Name of the model, in any case.
+
+    Returns:
+        str | None: Name of the pool Deployment, or None if the model isn't pooled.
+    """
+    model_name = model_name.capitalize()
+    pools = await list_pools()
+    return next((name for name, deploy in pools.items() if model_name in pool_models(deploy)), None)
+
+def models_patch(deployment: Deployment, model_names: list[str]) -> list[dict]:
+    """
+    Build a JSON patch that swaps the models of a pool, guarded by a test of the current
+    value so a concurrent change by another gateway replica fails instead of being overwritten.
+    Older pools that still roll out their changes are switched to Recreate as well.
+    """
+    env = deployment.raw["spec"]["template"]["spec"]["containers"][0]["env"]
+    index = next(i for i, var in enumerate(env) if var["name"] == "MODEL_NAMES")
+    path = f"/spec/template/spec/containers/0/env/{index}/value"
+    return [
+        {"op": "test", "path": path, "value": env[index]["value"]},
+        {"op": "replace", "path": path, "value": ",".join(model_names)},
+        {"op": "add", "path": "/spec/strategy", "value": {"type": "Recreate"}},
+    ]
+
+async def apply_plan(current: dict[str, Deployment], plan: dict[str, list[str]], prediction_interval: int):
+    """
+    Create, patch and delete pool Deployments to match a plan.
+
+    Pools that gain models are changed before pools that lose them, so a moved model is
+    briefly served twice rather than not at all. A changed pool's pod is stopped before its
+    replacement starts, so its other models pause for that restart instead of being predicted twice.
+
+    Args:
+        current (dict): Existing pool Deployments by name.
+        plan (dict): Models of each pool, by pool name.
+        prediction_interval (int): Prediction interval of the pools in the plan.
+    """
+    changed = {
+        name: models for name, models in plan.items()
+        if name not in current or set(models) != set(pool_models(current[name]))
+    }
+    gaining = [name for name, models in changed.items() if name not in current or len(models) >= len(pool_models(current[name]))]
+    losing = [name for name in changed if name not in gaining]
+
+    for name in gaining + losing:
+        models = changed[name]
+        if name not in current:
+            deployment = await template_pool_deployment(name, models, prediction_interval)
+            await deployment.create()
+            logger.info(f"Created {name} with {len(models)} models")
+        elif not models:
+            await current[name].delete()
+            logger.info(f"Deleted empty {name}")
+        else:
+            await current[name].patch(models_patch(current[name], models), type="json")
+            logger.info(f"Updated {name} to {len(models)} models")
+
+async def assign_models(model_names: list[str], prediction_interval: int) -> dict:
+    """
+    Pack models into pool Deployments with a shared prediction interval.
+
+    Args:
+        model_names (list[str]): Names of the registered MLflow models to serve.
+        prediction_interval (int): Interval between predictions.
+
+    Returns:
+        dict: A dictionary containing:
+            - results (list): Per-model result with a status of assigned, pooled, dedicated or not_on_mlflow.
+            - succeeded (int): Number of models assigned.
+            - failed (int): Number of models not assigned.
+    """
+    model_names = list(dict.fromkeys(name.capitalize() for name in model_names))
+    on_mlflow = await asyncio.gather(*(model_is_on_mlflow(name) for name in model_names))
+    dedicated = await asyncio.gather(*(deployment_index.exists(name) for name in model_names))
+
+    async with pool_lock:
+        all_pools = await list_pools()
+        pooled = {model: name for name, deploy in all_pools.items() for model in pool_models(deploy)}
+
+        results, placing = [], []
+        for model_name, found, has_server in zip(model_names, on_mlflow, dedicated):
+            if not found:
+                results.append(result(model_name, "not_on_mlflow", False))
+            elif has_server:
+                results.append(result(model_name, "dedicated", False))
+            elif model_name in pooled:
+                results.append(result(model_name, "pooled", False, pooled[model_name]))
+            else:
+                placing.append(model_name)
+
+        current = {name: deploy for name, deploy in all_pools.items() if pool_interval(deploy) == prediction_interval}
+        plan = plan_assign({name: pool_models(deploy) for name, deploy in current.items()}, placing, prediction_interval)
+        try:
+            await apply_plan(current, plan, prediction_interval)
+        except Exception as exc:
+            logger.exception(f"Could not assign {len(placing)} models to pools")
+            results.extend(result(model_name, "failed", False, error_detail(exc)) for model_name in placing)
+            return {"results": results, "succeeded": 0, "failed": len(results)}
+
+    placed = {model: name for name, models in plan.items() for model in models}
+    results.extend(result(model_name, "assigned", True, placed[model_name]) for model_name in placing)
+    succeeded = len(placing)
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+async def unassign_models(model_names: list[str]) -> dict:
+    """
+    Remove models from their pools, deleting pools left empty.
+
+    Args:
+        model_names (list[str]): Names of the models to stop serving.
+
+    Returns:
+        dict: A dictionary containing:
+            - results (list): Per-model result with a status of unassigned or not_pooled.
+            - succeeded (int): Number of models removed.
+            - failed (int): Number of models that were not in a pool.
+    """
+    removing = set(name.capitalize() for name in model_names)
+    async with pool_lock:
+        all_pools = await list_pools()
+        pooled = {model: name for name, deploy in all_pools.items() for model in pool_models(deploy)}
+
+        for interval in {pool_interval(deploy) for deploy in all_pools.values()}:
+            current = {name: deploy for name, deploy in all_pools.items() if pool_interval(deploy) == interval}
+            plan = {
+                name: [model for model in pool_models(deploy) if model not in removing]
+                for name, deploy in current.items()
+            }
+            await apply_plan(current, plan, interval)
+
+    results = [
+        result(model_name, "unassigned", True, pooled[model_name]) if model_name in pooled
+        else result(model_name, "not_pooled", False)
+        for model_name in dict.fromkeys(name.capitalize() for name in model_names)
+    ]
+    succeeded = sum(1 for outcome in results if outcome["ok"])
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+async def rebalance_pools() -> dict[str, list[str]]:
+    """
+    Even out the pools of every prediction interval and drop the ones no longer needed.
+
+    Returns:
+        dict: Models of each remaining pool, by pool name.
+    """
+    async with pool_lock:
+        all_pools = await list_pools()
+        layout = {}
+        for interval in {pool_interval(deploy) for deploy in all_pools.values()}:
+            current = {name: deploy for name, deploy in all_pools.items() if pool_interval(deploy) == interval}
+            plan = plan_rebalance({name: pool_models(deploy) for name, deploy in current.items()})
+            await apply_plan(current, plan, interval)
+            layout.update({name: models for name, models in plan.items() if models})
+    return dict(sorted(layout.items()))
+
+def project_pool(deployment: Deployment) -> dict:
+    return {
+        "name": deployment.name,
+        "prediction_interval": pool_interval(deployment),
+        "ready_replicas": deployment.raw.get("status", {}).get("readyReplicas", 0),
+        "models": pool_models(deployment),
+    }
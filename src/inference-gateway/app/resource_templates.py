@@ -1,6 +1,13 @@
-from kr8s.objects import Deployment
+from kr8s.asyncio.objects import Deployment
+from app.autoscaler import MIN_REPLICAS_ANNOTATION, MAX_REPLICAS_ANNOTATION
 
-def template_deployment(model_name: str, replicas: int, prediction_interval: str):
+def template_deployment(
+    model_name: str,
+    replicas: int,
+    prediction_interval: str,
+    min_replicas: int | None = None,
+    max_replicas: int | None = None,
+):
     """
     Templates a Kubernetes Deployment manifest for a model-inference-server microservice.
     You can see the YAML version of the deployment in the "reference-deployment.yaml" file in the same directory as this one
@@ -9,20 +16,32 @@ def template_deployment(model_name: str, replicas: int, prediction_interval: str
         model_name (str): Name of the mlflow model. 
         replicas (int): Number of pod replicas to deploy.
         prediction_interval (str): Prediction interval for the mlflow model.
+        min_replicas (int, optional): Lower replica bound for the autoscaler.
+        max_replicas (int, optional): Upper replica bound for the autoscaler. The autoscaler
+            only manages the Deployment when both bounds are set.
 
     Returns:
         Deployment: A templated Kubernetes Deployment object.
     """
+    annotations = {
+        "inference-server": "True",
+        "model-name": str(model_name)
+    }
+    if min_replicas is not None and max_replicas is not None:
+        annotations[MIN_REPLICAS_ANNOTATION] = str(min_replicas)
+        annotations[MAX_REPLICAS_ANNOTATION] = str(max_replicas)
+
     return Deployment({
     "apiVersion": "apps/v1",
     "kind": "Deployment",
     "metadata": {
         "name": f"{model_name}-inference-server",
         "namespace": "model-pipeline",
-        "annotations": {
-            "inference-server": "True",
+        "labels": {
+            "inference-server": "true",
             "model-name": str(model_name)
-        }
+        },
+        "annotations": annotations
     },
     "spec": {
         "replicas": replicas,
@@ -78,8 +97,122 @@ def template_deployment(model_name: str, replicas: int, prediction_interval: str
                     "name": "mariadb-config"
                     }
                 }
+                ],
+                "volumeMounts": [
+                {
+                    "name": "model-cache",
+                    "mountPath": "/var/cache/models"
+                }
                 ]
             }
+            ],
+            "volumes": [
+            {
+                "name": "model-cache",
+                "emptyDir": {}
+            }
+            ]
+        }
+        }
+    }
+})
+
+def template_pool_deployment(pool_name: str, model_names: list[str], prediction_interval: int):
+    """
+    Templates a Kubernetes Deployment manifest for a model-inference-server that serves a pool of models
+    from one process. It runs a single replica, since every replica would predict every model in the pool,
+    and is recreated rather than rolled, so the old and new pod never predict side by side.
+
+    Args:
+        pool_name (str): Name of the pool Deployment.
+        model_names (list[str]): Names of the mlflow models served by the pool.
+        prediction_interval (int): Prediction interval shared by the models.
+
+    Returns:
+        Deployment: A templated Kubernetes Deployment object.
+    """
+    return Deployment({
+    "apiVersion": "apps/v1",
+    "kind": "Deployment",
+    "metadata": {
+        "name": pool_name,
+        "namespace": "model-pipeline",
+        "labels": {
+            "inference-pool": "true",
+            "prediction-interval": str(prediction_interval)
+        }
+    },
+    "spec": {
+        "replicas": 1,
+        "strategy": {
+            "type": "Recreate"
+        },
+        "selector": {
+        "matchLabels": {
+            "app": pool_name
+        }
+        },
+        "template": {
+        "metadata": {
+            "labels": {
+            "app": pool_name
+            }
+        },
+        "spec": {
+            "containers": [
+            {
+                "name": pool_name,
+                "image": "icantkube/model-inference-server:v0.39",
+                "ports": [
+                {
+                    "containerPort": 80
+                }
+                ],
+                "env": [
+                {
+                    "name": "MODEL_NAMES",
+                    "value": ",".join(model_name.capitalize() for model_name in model_names)
+                },
+                {
+                    "name": "PREDICTION_INTERVAL",
+                    "value": str(prediction_interval)
+                }
+                ],
+                "envFrom": [
+                {
+                    "secretRef": {
+                    "name": "mlflow-credentials-secret"
+                    }
+                },
+                {
+                    "configMapRef": {
+                    "name": "mlflow-server-link-config"
+                    }
+                },
+                {
+                    "secretRef": {
+                    "name": "mariadb-credentials-secret"
+                    }
+                },
+                {
+                    "configMapRef": {
+                    "name": "mariadb-config"
+                    }
+                }
+                ],
+                "volumeMounts": [
+                {
+                    "name": "model-cache",
+                    "mountPath": "/var/cache/models"
+                }
+                ]
+            }
+            ],
+            "volumes": [
+            {
+                "name": "model-cache",
+                "emptyDir": {}
+            }
             ]
         }
         }
@@ -0,0 +1,234 @@
+import os
+import base64
+import asyncio
+import logging
+import kr8s.asyncio
+from kr8s import NotFoundError, ServerError
+from kr8s.asyncio.objects import Deployment
+from app.validation import CreateServer, ScaleServer, model_is_on_mlflow, model_lookups
+from app.resource_templates import template_deployment
+from app.deployment_index import INFERENCE_SERVER_SELECTOR, DeploymentIndex, server_name
+from app.logging_setup import logging_setup
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "model-pipeline"
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", 8))
+
+SERVER_FIELDS = ("model_name", "replicas", "ready_replicas", "prediction_interval", "image_tag")
+
+deployment_index = DeploymentIndex(NAMESPACE)
+
+def project_server(deployment: Deployment) -> dict:
+    """
+    Reduce an inference server Deployment to the fields clients use.
+
+    Args:
+        deployment (Deployment): Inference server Deployment.
+
+    Returns:
+        dict: model_name, replicas, ready_replicas, prediction_interval and image_tag.
+    """
+    raw = deployment.raw
+    container = raw["spec"]["template"]["spec"]["containers"][0]
+    env = {var["name"]: var.get("value") for var in container.get("env", [])}
+    interval = env.get("PREDICTION_INTERVAL")
+    image = container.get("image", "")
+    repository, _, tag = image.rpartition(":")
+    # A colon before the last slash belongs to a registry port, not a tag
+    if not repository or "/" in tag:
+        tag = "latest"
+
+    return {
+        "model_name": raw["metadata"].get("labels", {}).get("model-name")
+            or raw["metadata"]["name"].removesuffix("-inference-server"),
+        "replicas": raw["spec"].get("replicas", 0),
+        "ready_replicas": raw.get("status", {}).get("readyReplicas", 0),
+        "prediction_interval": int(interval) if interval and interval.isdigit() else None,
+        "image_tag": tag,
+    }
+
+def encode_cursor(name: str) -> str:
+    return base64.urlsafe_b64encode(name.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+
+async def list_inference_servers() -> list[Deployment]:
+    """
+    List the inference server Deployments, sorted by name, from the deployment index
+    or, until it has synced, from the API server with the inference server label selector.
+
+    Returns:
+        list: Kubernetes Deployment objects.
+    """
+    if await deployment_index.ready():
+        return deployment_index.list()
+
+    deployments = [
+        deploy async for deploy in kr8s.asyncio.get(
+            "deployments",
+            namespace=NAMESPACE,
+            label_selector=INFERENCE_SERVER_SELECTOR,
+        )
+    ]
+    return sorted(deployments, key=lambda deploy: deploy.name)
+
+def result(model_name: str, status: str, ok: bool, detail: str | None = None) -> dict:
+    outcome = {"model_name": model_name, "status": status, "ok": ok}
+    if detail is not None:
+        outcome["detail"] = detail
+    return outcome
+
+def error_detail(exc: Exception) -> str:
+    if isinstance(exc, ServerError) and exc.response is not None:
+        return f"{exc.response.status_code}: {exc}"
+    return str(exc)
+
+async def create_inference_server(server: CreateServer) -> dict:
+    """
+    Create the inference server Deployment of a model registered in MLflow.
+
+    Args:
+        server (CreateServer): Model name, replicas and prediction interval of the server.
+
+    Returns:
+        dict: Per-model result with a status of created, exists, pooled, not_on_mlflow or failed.
+    """
+    # app.pools builds on this module, so it can only be imported once both are loaded
+    from app.pools import pool_of
+
+    on_mlflow, server_exists, pool = await asyncio.gather(
+        model_is_on_mlflow(server.model_name),
+        deployment_index.exists(server.model_name),
+        pool_of(server.model_name),
+    )
+    if not on_mlflow:
+        return result(server.model_name, "not_on_mlflow", False)
+    if server_exists:
+        return result(server.model_name, "exists", False)
+    # Like a pool refusing a model with its own server, a pooled model would otherwise be predicted twice
+    if pool is not None:
+        return result(server.model_name, "pooled", False, pool)
+
+    deployment = await template_deployment(
+        server.model_name.lower(),
+        server.replicas,
+        server.prediction_interval,
+        server.min_replicas,
+        server.max_replicas,
+    )
+    try:
+        await deployment.create()
+    except ServerError as exc:
+        if exc.response is not None and exc.response.status_code == 409:
+            return result(server.model_name, "exists", False)
+        raise
+    finally:
+        model_lookups.invalidate(server.model_name)
+
+    logger.info(f"Created {deployment.name} with {server.replicas} replicas")
+    return result(server.model_name, "created", True)
+
+def scale_patch(deployment: Deployment, server: ScaleServer) -> list[dict]:
+    """
+    Build a JSON patch that changes replicas and prediction interval in place.
+
+    Args:
+        deployment (Deployment): Current inference server Deployment.
+        server (ScaleServer): Requested replicas and/or prediction interval.
+
+    Returns:
+        list: JSON patch operations, guarded by a test so a changed container layout fails instead of corrupting it.
+    """
+    patch = []
+    if server.replicas is not None:
+        patch.append({"op": "replace", "path": "/spec/replicas", "value": server.replicas})
+
+    if server.prediction_interval is not None:
+        env = deployment.raw["spec"]["template"]["spec"]["containers"][0].get("env", [])
+        index = next((i for i, var in enumerate(env) if var["name"] == "PREDICTION_INTERVAL"), None)
+        if index is None:
+            raise ValueError(f"{deployment.name} has no PREDICTION_INTERVAL to change")
+        path = f"/spec/template/spec/containers/0/env/{index}"
+        patch.append({"op": "test", "path": f"{path}/name", "value": "PREDICTION_INTERVAL"})
+        patch.append({"op": "replace", "path": f"{path}/value", "value": str(server.prediction_interval)})
+    return patch
+
+async def scale_inference_server(server: ScaleServer) -> dict:
+    """
+    Change the replicas and/or prediction interval of an existing inference server without recreating it.
+
+    Args:
+        server (ScaleServer): Model name with the new replicas and/or prediction interval.
+
+    Returns:
+        dict: Per-model result with a status of scaled, not_found or failed.
+    """
+    deployment = None
+    if await deployment_index.ready():
+        deployment = deployment_index.get(server.model_name)
+    else:
+        try:
+            deployment = await Deployment.get(server_name(server.model_name), namespace=NAMESPACE)
+        except NotFoundError:
+            pass
+    if deployment is None:
+        return result(server.model_name, "not_found", False)
+
+    try:
+        await deployment.patch(scale_patch(deployment, server), type="json")
+    except NotFoundError:
+        return result(server.model_name, "not_found", False)
+
+    logger.info(f"Scaled {deployment.name}: replicas={server.replicas}, prediction_interval={server.prediction_interval}")
+    return result(server.model_name, "scaled", True)
+
+async def delete_inference_server(model_name: str) -> dict:
+    """
+    Delete the inference server Deployment of a model.
+
+    Args:
+        model_name (str): Name of the model whose inference server should be deleted.
+
+    Returns:
+        dict: Per-model result with a status of deleted, not_found or failed.
+    """
+    model_lookups.invalidate(model_name)
+    deployment = await Deployment(server_name(model_name), namespace=NAMESPACE)
+    try:
+        await deployment.delete()
+    except NotFoundError:
+        return result(model_name, "not_found", False)
+
+    logger.info(f"Deleted {deployment.name}")
+    return result(model_name, "deleted", True)
+
+async def run_bulk(operation, items: list) -> dict:
+    """
+    Run a per-model operation over many models concurrently, at most BULK_MAX_CONCURRENCY at a time.
+
+    Args:
+        operation: Coroutine function taking one item and returning its result dict.
+        items (list): Request models with a model_name, in request order.
+
+    Returns:
+        dict: A dictionary containing:
+            - results (list): One result per item, in request order.
+            - succeeded (int): Number of items whose operation succeeded.
+            - failed (int): Number of items whose operation did not.
+    """
+    semaphore = asyncio.Semaphore(BULK_MAX_CONCURRENCY)
+
+    async def run_one(item):
+        async with semaphore:
+            try:
+                return await operation(item)
+            except Exception as exc:
+                logger.exception(f"Bulk operation failed for {item.model_name}")
+                return result(item.model_name, "failed", False, error_detail(exc))
+
+    results = await asyncio.gather(*(run_one(item) for item in items))
+    succeeded = sum(1 for outcome in results if outcome["ok"])
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
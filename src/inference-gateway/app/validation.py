@@ -1,6 +1,11 @@
+import os
 import kr8s
+import time
+import asyncio
 import logging
-from pydantic import BaseModel
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel, Field, model_validator
+from mlflow.exceptions import MlflowException
 from mlflow.tracking import MlflowClient
 from app.logging_setup import logging_setup
 
@@ -9,32 +14,161 @@ logger = logging.getLogger(__name__)
 
 client = MlflowClient()
 
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 100))
+MODEL_FOUND_TTL = float(os.getenv("MODEL_FOUND_TTL", 300))
+MODEL_MISSING_TTL = float(os.getenv("MODEL_MISSING_TTL", 30))
+
+# MlflowClient is blocking, so lookups run here instead of on the event loop
+mlflow_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MLFLOW_MAX_WORKERS", 4)),
+    thread_name_prefix="mlflow",
+)
+
 class CreateServer(BaseModel):
     model_name: str
     replicas: int = 1
     prediction_interval: int = 5
+    min_replicas: int | None = Field(default=None, ge=0)
+    max_replicas: int | None = Field(default=None, ge=1)
+
+    @model_validator(mode="after")
+    def check_replica_bounds(self):
+        if (self.min_replicas is None) != (self.max_replicas is None):
+            raise ValueError("Set both min_replicas and max_replicas to enable autoscaling")
+        if self.min_replicas is not None and self.min_replicas > self.max_replicas:
+            raise ValueError("min_replicas must not exceed max_replicas")
+        return self
 
 class DeleteServer(BaseModel):
     model_name: str
 
-def model_is_on_mlflow(model_name: str):
+class ScaleServer(BaseModel):
+    model_name: str
+    replicas: int | None = Field(default=None, ge=0)
+    prediction_interval: int | None = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def check_change(self):
+        if self.replicas is None and self.prediction_interval is None:
+            raise ValueError("Set replicas and/or prediction_interval")
+        return self
+
+class BulkCreateServers(BaseModel):
+    servers: list[CreateServer] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BulkScaleServers(BaseModel):
+    servers: list[ScaleServer] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BulkDeleteServers(BaseModel):
+    servers: list[DeleteServer] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+class AssignModels(BaseModel):
+    model_names: list[str] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+    prediction_interval: int = Field(default=5, gt=0)
+
+class UnassignModels(BaseModel):
+    model_names: list[str] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+def registered_on_mlflow(model_name: str) -> bool:
     """
-    Check whether a model is registered in MLflow.
+    Blocking lookup of a registered model in MLflow.
 
     Args:
         model_name (str): Name of the MLflow registered model.
 
     Returns:
-        bool: Returns True if the model exists in MLflow.
+        bool: True if the model is registered, False if MLflow reports it does not exist.
+
+    Raises:
+        MlflowException: If MLflow could not answer, e.g. it is unreachable.
     """
     try:
         client.get_registered_model(model_name)
-        logger.info(f"{model_name} found in Mlflow")
         return True
-    except:
-        logger.info(f"{model_name} not found in Mlflow")
+    except MlflowException as exc:
+        if exc.error_code == "RESOURCE_DOES_NOT_EXIST":
+            return False
+        raise
+
+class ModelLookupCache:
+    """
+    Remembers MLflow lookups for a while, found models for longer than missing ones,
+    and lets concurrent lookups of the same model share a single MLflow call.
+    """
+
+    def __init__(self, found_ttl: float, missing_ttl: float):
+        self.found_ttl = found_ttl
+        self.missing_ttl = missing_ttl
+        self.entries: dict[str, tuple[bool, float]] = {}
+        self.pending: dict[str, asyncio.Task] = {}
+
+    async def get(self, model_name: str) -> bool:
+        """
+        Check whether a model is registered in MLflow, answering from the cache when possible.
+
+        Args:
+            model_name (str): Name of the MLflow registered model.
+
+        Returns:
+            bool: True if the model is registered.
+        """
+        entry = self.entries.get(model_name)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        task = self.pending.get(model_name)
+        if task is None:
+            task = asyncio.create_task(self._lookup(model_name))
+            self.pending[model_name] = task
+        # One caller giving up must not cancel the lookup the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _lookup(self, model_name: str) -> bool:
+        loop = asyncio.get_running_loop()
+        try:
+            found = await loop.run_in_executor(mlflow_executor, registered_on_mlflow, model_name)
+        finally:
+            current = self.pending.get(model_name) is asyncio.current_task()
+            if current:
+                del self.pending[model_name]
+
+        # Skip caching when invalidate() ran while MLflow was being asked
+        if current:
+            ttl = self.found_ttl if found else self.missing_ttl
+            self.entries[model_name] = (found, time.monotonic() + ttl)
+        return found
+
+    def invalidate(self, model_name: str):
+        """
+        Forget a cached lookup so the next check asks MLflow again.
+
+        Args:
+            model_name (str): Name of the MLflow registered model.
+        """
+        self.entries.pop(model_name, None)
+        self.pending.pop(model_name, None)
+
+model_lookups = ModelLookupCache(MODEL_FOUND_TTL, MODEL_MISSING_TTL)
+
+async def model_is_on_mlflow(model_name: str) -> bool:
+    """
+    Check whether a model is registered in MLflow without blocking the event loop.
+
+    Args:
+        model_name (str): Name of the MLflow registered model.
+
+    Returns:
+        bool: Returns True if the model exists in MLflow.
+    """
+    try:
+        found = await model_lookups.get(model_name)
+    except Exception as exc:
+        logger.warning(f"Could not look up {model_name} in Mlflow: {exc}")
         return False
 
+    logger.info(f"{model_name} {'found' if found else 'not found'} in Mlflow")
+    return found
+
 async def inference_server_exists(model_name, namespace):
     """
     Check whether an inference server deployment already exists in Kubernetes.
@@ -47,7 +181,7 @@ async def inference_server_exists(model_name, namespace):
         bool: Returns True if at least one matching deployment exists in the namespace.
     """
     deploy_list = [
-        deploy.exists() async for deploy in kr8s.asyncio.get(
+        await deploy.exists() async for deploy in kr8s.asyncio.get(
             "deployments", 
             f"{model_name.lower()}-inference-server", 
             namespace=namespace
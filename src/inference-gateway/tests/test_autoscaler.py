@@ -0,0 +1,72 @@
+import asyncio
+from app.autoscaler import MAX_REPLICAS_ANNOTATION, MIN_REPLICAS_ANNOTATION, Autoscaler
+
+class FakeKube:
+    """One autoscaled Deployment whose pods come up as soon as it is scaled."""
+
+    def __init__(self, replicas: int, max_replicas: int = 10):
+        self.replicas = replicas
+        self.max_replicas = max_replicas
+        self.history = [replicas]
+
+    async def list_deployments(self) -> list[dict]:
+        return [{
+            "metadata": {
+                "name": "pump-inference-server",
+                "annotations": {MIN_REPLICAS_ANNOTATION: "1", MAX_REPLICAS_ANNOTATION: str(self.max_replicas)},
+            },
+            "spec": {"replicas": self.replicas},
+        }]
+
+    async def list_pod_ips(self, deployment: dict) -> dict[str, str]:
+        return {f"pod-{index}": f"10.0.0.{index}" for index in range(self.replicas)}
+
+    async def scale(self, name: str, replicas: int):
+        self.replicas = replicas
+        self.history.append(replicas)
+
+class FakeStats:
+    """Reports the same load from every replica, computed from the current replica count."""
+
+    def __init__(self, kube: FakeKube, load):
+        self.kube = kube
+        self.load = load
+
+    async def fetch(self, pod_ip: str) -> dict:
+        return {
+            "prediction_interval": 5,
+            "utilization": self.load(self.kube.replicas),
+            "lag_seconds": 0.0,
+            "cpu_seconds": 0.0,
+            "uptime_seconds": 0.0,
+        }
+
+def run_passes(kube: FakeKube, stats: FakeStats, passes: int) -> list[int]:
+    autoscaler = Autoscaler(kube, stats, clock=lambda: 0.0)
+
+    async def run():
+        for _ in range(passes):
+            await autoscaler.reconcile()
+
+    asyncio.run(run())
+    return kube.history
+
+def test_holds_when_scaling_out_does_not_lower_the_load():
+    # Every replica runs all jobs, so its load doesn't depend on how many replicas there are
+    kube = FakeKube(replicas=1)
+    history = run_passes(kube, FakeStats(kube, lambda replicas: 0.75), passes=10)
+
+    assert history == [1, 2]
+
+def test_keeps_scaling_while_the_load_spreads_over_replicas():
+    kube = FakeKube(replicas=1)
+    history = run_passes(kube, FakeStats(kube, lambda replicas: 2.4 / replicas), passes=10)
+
+    assert history[0] == 1 and history[-1] == 4
+    assert history == sorted(history)
+
+def test_scales_down_when_idle():
+    kube = FakeKube(replicas=4)
+    history = run_passes(kube, FakeStats(kube, lambda replicas: 0.1), passes=1)
+
+    assert history == [4, 1]
@@ -0,0 +1,67 @@
+import asyncio
+from contextlib import asynccontextmanager
+import kr8s.asyncio
+from kr8s.asyncio.objects import Deployment
+import app.deployment_index as deployment_index
+from app.deployment_index import DeploymentIndex, legacy_labels
+
+class FakeDeployment:
+    def __init__(self, found: bool):
+        self.found = found
+
+    async def exists(self) -> bool:
+        return self.found
+
+def fake_get(existing: set[str]):
+    # Hands back an object either way; only exists() tells whether the Deployment is there
+    async def get(kind, name, namespace=None):
+        yield FakeDeployment(name in existing)
+    return get
+
+def test_exists_asks_the_api_server_before_the_index_has_synced(monkeypatch):
+    monkeypatch.setattr(deployment_index, "SYNC_WAIT_TIMEOUT", 0.01)
+    monkeypatch.setattr(kr8s.asyncio, "get", fake_get({"pump-inference-server"}))
+
+    async def lookups():
+        index = DeploymentIndex("model-pipeline")
+        return await index.exists("Pump"), await index.exists("Turbine")
+
+    assert asyncio.run(lookups()) == (True, False)
+
+def manifest(name: str, labels: dict | None = None, annotations: dict | None = None) -> dict:
+    return {"metadata": {"name": name, "labels": labels or {}, "annotations": annotations or {}}}
+
+def test_legacy_labels():
+    legacy = manifest("pump-inference-server", annotations={"inference-server": "True", "model-name": "pump"})
+    labelled = manifest("turbine-inference-server", labels={"inference-server": "true"})
+    pool = manifest("inference-pool-5s-0", labels={"inference-pool": "true"})
+
+    assert legacy_labels(legacy) == {"inference-server": "true", "model-name": "pump"}
+    assert legacy_labels(labelled) is None
+    assert legacy_labels(pool) is None
+
+def test_relabel_legacy_patches_only_annotation_only_servers(monkeypatch):
+    items = [
+        manifest("pump-inference-server", annotations={"inference-server": "True", "model-name": "pump"}),
+        manifest("turbine-inference-server", labels={"inference-server": "true"}),
+    ]
+    patched = []
+
+    class FakeApi:
+        @asynccontextmanager
+        async def call_api(self, method, **kwargs):
+            class Response:
+                def json(self):
+                    return {"items": items, "metadata": {"resourceVersion": "1"}}
+            yield Response()
+
+    async def patch(self, body, **kwargs):
+        patched.append((self.raw["metadata"]["name"], body))
+
+    monkeypatch.setattr(Deployment, "patch", patch)
+    index = DeploymentIndex("model-pipeline")
+    index.api = FakeApi()
+    asyncio.run(index.relabel_legacy())
+
+    assert patched == [("pump-inference-server", {"metadata": {"labels": {"inference-server": "true", "model-name": "pump"}}})]
+    assert index.relabelled
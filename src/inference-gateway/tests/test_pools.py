@@ -0,0 +1,51 @@
+import asyncio
+import app.servers as servers
+import app.pools as pools
+import app.validation as validation
+from app.validation import CreateServer
+
+# Registered the way model-train registers them: capitalized, and MLflow names are case-sensitive
+REGISTERED_MODELS = {"Pump", "Turbine"}
+
+async def registry_lookup(model_name: str) -> bool:
+    return model_name in REGISTERED_MODELS
+
+async def no_dedicated_server(model_name: str) -> bool:
+    return False
+
+async def no_pools() -> dict:
+    return {}
+
+def test_assign_models_looks_up_capitalized_names(monkeypatch):
+    applied = {}
+
+    async def apply_plan(current, plan, prediction_interval):
+        applied.update(plan)
+
+    monkeypatch.setattr(validation.model_lookups, "get", registry_lookup)
+    monkeypatch.setattr(pools.deployment_index, "exists", no_dedicated_server)
+    monkeypatch.setattr(pools, "list_pools", no_pools)
+    monkeypatch.setattr(pools, "apply_plan", apply_plan)
+
+    outcome = asyncio.run(pools.assign_models(["pump", "PUMP", "turbine", "Compressor"], 5))
+
+    statuses = {item["model_name"]: item["status"] for item in outcome["results"]}
+    assert statuses == {"Pump": "assigned", "Turbine": "assigned", "Compressor": "not_on_mlflow"}
+    assert outcome["succeeded"] == 2
+    assert sorted(model for models in applied.values() for model in models) == ["Pump", "Turbine"]
+
+class FakePool:
+    def __init__(self, model_names: str):
+        self.raw = {"spec": {"template": {"spec": {"containers": [{"env": [{"name": "MODEL_NAMES", "value": model_names}]}]}}}}
+
+def test_create_inference_server_refuses_pooled_models(monkeypatch):
+    async def one_pool() -> dict:
+        return {"inference-pool-5s-0": FakePool("Pump,Turbine")}
+
+    monkeypatch.setattr(validation.model_lookups, "get", registry_lookup)
+    monkeypatch.setattr(servers.deployment_index, "exists", no_dedicated_server)
+    monkeypatch.setattr(pools, "list_pools", one_pool)
+
+    outcome = asyncio.run(servers.create_inference_server(CreateServer(model_name="Pump", replicas=1, prediction_interval=5)))
+
+    assert outcome == {"model_name": "Pump", "status": "pooled", "ok": False, "detail": "inference-pool-5s-0"}
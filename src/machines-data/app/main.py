@@ -1,6 +1,4 @@
 import os
-from typing import List, Optional
-
 import pymysql
 from fastapi import FastAPI, HTTPException
 
@@ -11,6 +9,8 @@ DEFAULT_DB_PORT = 3306
 DEFAULT_DB_NAME = "machines"
 DEFAULT_DB_USER = "admin"
 DEFAULT_DB_TABLE = "machines"
+DEFAULT_DB_RESULTS_TABLE = "inference_results"
+DEFAULT_RESULTS_WINDOW = 10
 
 
 def getenv_int(name: str, default: int) -> int:
@@ -37,43 +37,13 @@ def get_db_config() -> dict:
     }
 
 
-def get_table_name() -> str:
-    table = os.getenv("DB_TABLE", DEFAULT_DB_TABLE)
+def get_table_name(env_name: str = "DB_TABLE", default: str = DEFAULT_DB_TABLE) -> str:
+    table = os.getenv(env_name, default)
     if not table.replace("_", "").isalnum():
-        raise RuntimeError("DB_TABLE must be alphanumeric/underscore only")
+        raise RuntimeError(f"{env_name} must be alphanumeric/underscore only")
     return table
 
 
-def parse_number(value: Optional[str]) -> Optional[float]:
-    if value is None:
-        return None
-    text = value.strip()
-    if text == "":
-        return None
-    try:
-        return int(text)
-    except ValueError:
-        try:
-            return float(text)
-        except ValueError:
-            return None
-
-
-def parse_csv_numbers(value: Optional[str]) -> Optional[List[float]]:
-    if value is None:
-        return None
-    text = value.strip()
-    if text == "":
-        return None
-    items = []
-    for part in text.split(","):
-        num = parse_number(part)
-        if num is None:
-            continue
-        items.append(num)
-    return items if items else None
-
-
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -82,9 +52,21 @@ def health():
 @app.get("/all")
 def get_all():
     table = get_table_name()
+    results_table = get_table_name("DB_RESULTS_TABLE", DEFAULT_DB_RESULTS_TABLE)
+    window = getenv_int("RESULTS_WINDOW", DEFAULT_RESULTS_WINDOW)
+    # The newest results of every machine. Per machine, the subquery seeks the (machine_name, id)
+    # index from its newest row to the oldest id in the window, and the join reads only that range;
+    # machines with fewer results than the window get all of them
     query = (
-        "SELECT name, status, last_inference_results, training_progress "
-        f"FROM `{table}`"
+        "SELECT m.name, m.status, m.training_progress, r.result "
+        f"FROM `{table}` AS m "
+        f"LEFT JOIN `{results_table}` AS r ON r.machine_name = m.name AND %s > 0 AND r.id >= COALESCE(("
+        f"SELECT id FROM `{results_table}` "
+        "WHERE machine_name = m.name "
+        "ORDER BY id DESC "
+        "LIMIT 1 OFFSET %s"
+        "), 0) "
+        "ORDER BY m.name, r.id"
     )
 
     try:
@@ -94,22 +76,26 @@ def get_all():
 
     try:
         with conn.cursor() as cursor:
-            cursor.execute(query)
+            cursor.execute(query, (window, max(window - 1, 0)))
             rows = cursor.fetchall()
     except pymysql.MySQLError as exc:
         raise HTTPException(status_code=500, detail=f"DB query error: {exc}") from exc
     finally:
         conn.close()
 
-    results = []
+    machines = {}
     for row in rows:
-        results.append(
-            {
+        machine = machines.get(row["name"])
+        if machine is None:
+            machine = machines[row["name"]] = {
                 "name": row.get("name"),
                 "status": row.get("status"),
-                "lastInferenceResults": parse_csv_numbers(row.get("last_inference_results")),
+                "lastInferenceResults": None,
                 "trainingProgress": row.get("training_progress"),
             }
-        )
+        if row.get("result") is not None:
+            if machine["lastInferenceResults"] is None:
+                machine["lastInferenceResults"] = []
+            machine["lastInferenceResults"].append(row["result"])
 
-    return results
+    return list(machines.values())
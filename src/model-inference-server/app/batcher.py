@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import numpy as np
+from typing import Any
+from app.logging_setup import logging_setup
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Gathers the input rows that jobs of one model submit close together, stacks them into
+    one matrix and runs a single model.predict over it, so sklearn's per-call overhead is
+    paid once per batch instead of once per row.
+
+    A batch is predicted as soon as it holds max_batch_size rows, or max_wait seconds after
+    its first row arrived. If the batch as a whole fails, e.g. because one row has the wrong
+    number of features, its rows are predicted one by one so only the bad row fails.
+    """
+
+    def __init__(self, model_name: str, model: Any, max_batch_size: int, max_wait: float):
+        self.model_name = model_name
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending: list[tuple[np.ndarray, asyncio.Future]] = []
+        # Latest input, used to warm up a new version of the model before it replaces this one
+        self.last_row = None
+        self.timer = None
+        # Strong references to running batches, which the event loop only holds weakly
+        self.running: set[asyncio.Task] = set()
+
+    async def predict(self, row) -> Any:
+        """
+        Predict one input row as part of the next batch.
+
+        Args:
+            row: Feature values of one sample.
+
+        Returns:
+            The model's prediction for the row.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.last_row = np.asarray(row).ravel()
+        self.pending.append((self.last_row, future))
+        if len(self.pending) >= self.max_batch_size:
+            self.dispatch()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_wait, self.dispatch)
+        return await future
+
+    def dispatch(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self.run_batch(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def run_batch(self, batch: list[tuple[np.ndarray, asyncio.Future]]):
+        try:
+            predictions = await asyncio.to_thread(self.model.predict, np.vstack([row for row, _ in batch]))
+        except Exception as exc:
+            if len(batch) == 1:
+                self.settle(batch[0][1], exception=exc)
+                return
+            logger.warning(f"Batch of {len(batch)} rows failed for {self.model_name}, predicting them one by one")
+            await asyncio.gather(*(self.run_batch([item]) for item in batch))
+            return
+
+        for (_, future), prediction in zip(batch, np.asarray(predictions)):
+            self.settle(future, prediction)
+
+    def settle(self, future: asyncio.Future, prediction=None, exception: Exception | None = None):
+        # The job may have given up on its prediction, e.g. when the scheduler is stopping
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(prediction)
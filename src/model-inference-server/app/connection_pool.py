@@ -0,0 +1,135 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable
+import pymysql
+from app.logging_setup import logging_setup
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+# Errors after which a connection can't be trusted anymore, as opposed to e.g. a constraint violation
+CONNECTION_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+# OperationalErrors that only abort the statement and leave the connection usable
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+
+def connection_lost(exc: BaseException) -> bool:
+    """Whether an error broke the connection itself, rather than just failing the statement."""
+    if not isinstance(exc, CONNECTION_ERRORS):
+        return False
+    code = exc.args[0] if exc.args else None
+    return not (isinstance(exc, pymysql.err.OperationalError) and code in (ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK))
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent MariaDB connections, shared by every prediction of the process.
+
+    Idle connections are handed out most recently used first. One that sat idle longer than
+    ping_after is pinged before reuse and replaced if the server dropped it, one older than
+    max_lifetime is closed instead of reused, and one that failed with a connection error
+    is discarded rather than returned to the pool.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], pymysql.connections.Connection],
+        max_size: int,
+        max_lifetime: float,
+        ping_after: float,
+        acquire_timeout: float,
+    ):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.acquire_timeout = acquire_timeout
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        # (connection, created_at, last_used_at)
+        self.idle: deque[tuple[pymysql.connections.Connection, float, float]] = deque()
+        self.created: dict[int, float] = {}
+
+    def _close(self, conn: pymysql.connections.Connection):
+        self.created.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _reuse(self) -> pymysql.connections.Connection | None:
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                conn, created_at, last_used_at = self.idle.pop()
+
+            now = time.monotonic()
+            if now - created_at > self.max_lifetime:
+                self._close(conn)
+                continue
+            if now - last_used_at > self.ping_after:
+                try:
+                    conn.ping(reconnect=False)
+                except CONNECTION_ERRORS:
+                    logger.info("Dropping pooled MariaDB connection that failed its health check")
+                    self._close(conn)
+                    continue
+            return conn
+
+    def acquire(self) -> pymysql.connections.Connection:
+        if not self.slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"No MariaDB connection free within {self.acquire_timeout}s")
+        try:
+            conn = self._reuse()
+            if conn is None:
+                conn = self.connect()
+                self.created[id(conn)] = time.monotonic()
+            return conn
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, conn: pymysql.connections.Connection, broken: bool = False):
+        created_at = self.created.get(id(conn), 0.0)
+        now = time.monotonic()
+        if broken or now - created_at > self.max_lifetime:
+            self._close(conn)
+        else:
+            with self.lock:
+                self.idle.append((conn, created_at, now))
+        self.slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for one transaction, rolled back if it raises.
+
+        Yields:
+            pymysql.connections.Connection: A healthy connection.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException as exc:
+            if connection_lost(exc):
+                self.release(conn, broken=True)
+                raise
+            try:
+                conn.rollback()
+            except Exception:
+                self.release(conn, broken=True)
+                raise
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """Close every idle connection, e.g. on shutdown."""
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for conn, _, _ in idle:
+            self._close(conn)
@@ -1,5 +1,34 @@
 import os
 
 MODEL_NAME = os.getenv("MODEL_NAME")
+# Packed mode: one process runs every job of a comma separated MODEL_NAMES list, set on pool deployments.
+# A job is a model name, or model:machine when the model predicts for a differently named machine.
+PREDICTION_JOBS = [
+    tuple(entry.split(":", 1)) if ":" in entry else (entry, entry)
+    for entry in (part.strip() for part in os.getenv("MODEL_NAMES", MODEL_NAME or "").split(","))
+    if entry
+]
 PREDICTION_INTERVAL = int(os.getenv("PREDICTION_INTERVAL"))
+# Predictions in flight at once; most of their time is spent waiting on the sensor service and MariaDB
+MAX_CONCURRENT_PREDICTIONS = int(os.getenv("MAX_CONCURRENT_PREDICTIONS", "8"))
+# "compiled" predicts plain decision trees with app.tree_engine, "sklearn" always uses the loaded model
+TREE_ENGINE = os.getenv("TREE_ENGINE", "compiled")
+# Model artifacts cached on disk across restarts, and how often MLflow is asked for new versions
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "/var/cache/models")
+MODEL_CACHE_KEEP = int(os.getenv("MODEL_CACHE_KEEP", "3"))
+MODEL_POLL_INTERVAL = float(os.getenv("MODEL_POLL_INTERVAL", "300"))
+# Rows of one model gathered into a single predict call, and how long the first row waits for company.
+# A batch is capped by the model's jobs and MAX_CONCURRENT_PREDICTIONS too, and sent as soon as it is full.
+# Only hand-written MODEL_NAMES lists with model:machine jobs give a model several jobs; the Deployments
+# the inference gateway creates run one job per model, so batching never engages on them.
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "64"))
+MAX_BATCH_WAIT_MS = int(os.getenv("MAX_BATCH_WAIT_MS", "20"))
+# Write-behind buffer of inference results, flushed as one multi-row INSERT by size or by age
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "500"))
+WRITE_FLUSH_INTERVAL_MS = int(os.getenv("WRITE_FLUSH_INTERVAL_MS", "1000"))
+WRITE_BUFFER_SIZE = int(os.getenv("WRITE_BUFFER_SIZE", "10000"))
+# "block" holds predictions back while the buffer is full, "drop" discards the oldest buffered result
+WRITE_OVERFLOW_POLICY = os.getenv("WRITE_OVERFLOW_POLICY", "block")
+WRITE_MAX_RETRIES = int(os.getenv("WRITE_MAX_RETRIES", "5"))
+WRITE_SHUTDOWN_TIMEOUT = float(os.getenv("WRITE_SHUTDOWN_TIMEOUT", "20"))
 SENSOR_DATA_ENDPOINT = "http://sensor-data-service/get_next_line"
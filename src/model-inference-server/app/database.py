@@ -2,11 +2,37 @@ import os
 import pymysql
 import logging
 from app.logging_setup import logging_setup
-from app.constants import MODEL_NAME
+from app.constants import MAX_CONCURRENT_PREDICTIONS
+from app.connection_pool import CONNECTION_ERRORS, ConnectionPool, connection_lost
 
 logging_setup()
 logger = logging.getLogger(__name__)
 
+# pymysql has no server-side prepared statements, so the SQL is built once here and only the
+# parameters are escaped per call
+INSERT_RESULT_QUERY = (
+    "INSERT INTO inference_results (machine_name, result) "
+    "VALUES (%s, %s)"
+)
+# Keeps the newest RESULTS_RETENTION rows of a machine; the extra derived table lets MariaDB
+# read the table it deletes from
+PRUNE_RESULTS_QUERY = (
+    "DELETE FROM inference_results "
+    "WHERE machine_name = %s AND id < ("
+    "SELECT id FROM ("
+    "SELECT id FROM inference_results "
+    "WHERE machine_name = %s "
+    "ORDER BY id DESC "
+    "LIMIT 1 OFFSET %s"
+    ") AS oldest_kept"
+    ")"
+)
+# MariaDB error raised by the machine_name foreign key when the machine doesn't exist
+ER_NO_REFERENCED_ROW = 1452
+
+RESULTS_RETENTION = int(os.getenv("RESULTS_RETENTION", "100"))
+RESULTS_PRUNE_EVERY = int(os.getenv("RESULTS_PRUNE_EVERY", "100"))
+
 def _get_db_config() -> dict:
     db_port = int(os.getenv("DB_PORT", "3306"))
     db_password = os.getenv("MARIADB_ROOT_PASSWORD", "")
@@ -20,70 +46,89 @@ def _get_db_config() -> dict:
         "connect_timeout": 5,
         "read_timeout": 10,
         "write_timeout": 10,
+        # Every write is a single statement, so committing it costs no extra round trip
+        "autocommit": True,
     }
 
-def _parse_csv_numbers(value: str | None) -> list[float] | None:
-    if value is None:
-        return None
-    text = value.strip()
-    if text == "":
-        return None
-    items = []
-    for part in text.split(","):
-        if part is None:
-            continue
-        token = part.strip()
-        if token == "":
-            continue
-        try:
-            items.append(int(token))
-        except ValueError:
-            try:
-                items.append(float(token))
-            except ValueError:
-                continue
-    return items if items else None
+def _connect() -> pymysql.connections.Connection:
+    return pymysql.connect(**_get_db_config())
 
-def add_inference_result(inference_result: int):
-    if not MODEL_NAME:
-        raise RuntimeError("MODEL_NAME is required")
+# Every prediction in flight holds at most one connection
+pool = ConnectionPool(
+    _connect,
+    max_size=int(os.getenv("DB_POOL_SIZE", str(MAX_CONCURRENT_PREDICTIONS))),
+    # Below MariaDB's wait_timeout, so the server never closes a connection the pool still trusts
+    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+    ping_after=float(os.getenv("DB_POOL_PING_AFTER", "30")),
+    acquire_timeout=float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10")),
+)
 
-    select_query = (
-        "SELECT name, last_inference_results "
-        "FROM machines "
-        "WHERE name = %s "
-        "LIMIT 1"
-    )
-    update_query = (
-        "UPDATE machines "
-        "SET last_inference_results = %s "
-        "WHERE name = %s"
-    )
+writes_since_prune: dict[str, int] = {}
 
-    conn = pymysql.connect(**_get_db_config())
+def _insert_one_by_one(cursor, results: list[tuple[str, int]]) -> int:
+    written = 0
+    for machine_name, inference_result in results:
+        try:
+            cursor.execute(INSERT_RESULT_QUERY, (machine_name, inference_result))
+            written += 1
+        except pymysql.err.IntegrityError as exc:
+            if exc.args[0] != ER_NO_REFERENCED_ROW:
+                raise
+            logger.warning("No machine row found for model %s", machine_name)
+    return written
 
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(select_query, (MODEL_NAME,))
-            row = cursor.fetchone()
+def _insert_inference_results(conn: pymysql.connections.Connection, results: list[tuple[str, int]]) -> int:
+    with conn.cursor() as cursor:
+        try:
+            # pymysql folds this into a single multi-row INSERT
+            cursor.executemany(INSERT_RESULT_QUERY, results)
+            return len(results)
+        except pymysql.err.IntegrityError as exc:
+            if exc.args[0] != ER_NO_REFERENCED_ROW:
+                raise
+            # One unknown machine fails the whole statement, so the rest are written on their own
+            return _insert_one_by_one(cursor, results)
+
+def _prune_inference_results(results: list[tuple[str, int]]):
+    due = []
+    for machine_name in {machine_name for machine_name, _ in results}:
+        # Every replica counts on its own, which only makes pruning a little more frequent
+        writes = writes_since_prune.get(machine_name, 0) + sum(1 for name, _ in results if name == machine_name)
+        writes_since_prune[machine_name] = writes
+        if writes >= RESULTS_PRUNE_EVERY:
+            due.append(machine_name)
+    if not due:
+        return
 
-            if row is None:
-                logger.warning("No machine row found for model %s", MODEL_NAME)
-                return {"updated": False, "reason": "machine_not_found", "name": MODEL_NAME}
+    with pool.connection() as conn, conn.cursor() as cursor:
+        for machine_name in due:
+            cursor.execute(PRUNE_RESULTS_QUERY, (machine_name, machine_name, RESULTS_RETENTION - 1))
+            writes_since_prune[machine_name] = 0
 
-            current = _parse_csv_numbers(row.get("last_inference_results")) or []
-            if len(current) >= 10:
-                current.pop(0)
-            current.append(inference_result)
-            serialized = ",".join(str(value) for value in current)
+def add_inference_results(results: list[tuple[str, int]]) -> int:
+    """
+    Insert a batch of inference results in one statement, then prune old results of their machines.
 
-            cursor.execute(update_query, (serialized, MODEL_NAME))
-            conn.commit()
+    Args:
+        results (list[tuple[str, int]]): (machine name, result) pairs.
 
-            return {
-                "updated": cursor.rowcount > 0,
-                "name": MODEL_NAME,
-                "lastInferenceResults": current,
-            }
-    finally:
-        conn.close()
+    Returns:
+        int: Number of results written; those of machines without a row are left out.
+    """
+    try:
+        with pool.connection() as conn:
+            written = _insert_inference_results(conn, results)
+    except CONNECTION_ERRORS as exc:
+        if not connection_lost(exc):
+            raise
+        # The pool has discarded the connection, so the retry runs on a fresh or health-checked one
+        logger.warning(f"Retrying {len(results)} inference results after a MariaDB connection error: {exc!r}")
+        with pool.connection() as conn:
+            written = _insert_inference_results(conn, results)
+
+    # The results are committed by now, so a failed prune must not fail, and repeat, the write
+    try:
+        _prune_inference_results(results)
+    except Exception as exc:
+        logger.warning(f"Could not prune old inference results, retrying on a later write: {exc!r}")
+    return written
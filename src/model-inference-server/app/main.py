@@ -1,27 +1,141 @@
-import mlflow
+import signal
+import asyncio
 import logging
 import numpy as np
-from time import sleep
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from app.logging_setup import logging_setup
-from app.database import add_inference_result
+from app.database import add_inference_results, pool
 from app.sensor_data import get_input_data
-from app.constants import MODEL_NAME, PREDICTION_INTERVAL
+from app.constants import (
+    PREDICTION_JOBS,
+    PREDICTION_INTERVAL,
+    MAX_CONCURRENT_PREDICTIONS,
+    MAX_BATCH_SIZE,
+    MAX_BATCH_WAIT_MS,
+    TREE_ENGINE,
+    MODEL_CACHE_DIR,
+    MODEL_CACHE_KEEP,
+    MODEL_POLL_INTERVAL,
+    WRITE_BATCH_SIZE,
+    WRITE_FLUSH_INTERVAL_MS,
+    WRITE_BUFFER_SIZE,
+    WRITE_OVERFLOW_POLICY,
+    WRITE_MAX_RETRIES,
+    WRITE_SHUTDOWN_TIMEOUT,
+)
+from app.scheduler import PredictionJob, PredictionScheduler
+from app.result_writer import ResultWriter
+from app.batcher import MicroBatcher
+from app.model_store import ModelStore, ModelReloader
+from app.stats import PredictionStats, serve_stats
 
 logging_setup()
 logger = logging.getLogger(__name__)
 
-# Pull Model from MLFlow
-model_uri = f"models:/{MODEL_NAME}/latest"
-model = mlflow.sklearn.load_model(model_uri)
-logger.info("Model loaded")
-
-while True:
-    # Perform Inference
-    X = get_input_data()
-    X = np.array(X).reshape(1, -1)
-    predictions = model.predict(X)
-    prediction_value = int(np.asarray(predictions).ravel()[0])
-    update_result = add_inference_result(prediction_value)
-
-    logger.info(f"Model Prediction: {predictions}, DB Update: {update_result}")
-    sleep(PREDICTION_INTERVAL)
+def load_models(store: ModelStore, model_names: list[str]) -> tuple[dict, dict[str, int]]:
+    """
+    Load every model, from the local cache when it has a version of it.
+
+    Args:
+        store (ModelStore): On-disk cache of MLflow model artifacts.
+        model_names (list[str]): Names of the MLflow registered models to serve.
+
+    Returns:
+        tuple: Loaded models by name, compiled to flat arrays where possible, and their
+            versions by name. With several models, one that fails to load is skipped so
+            it doesn't take the rest of the pool down.
+    """
+    if not model_names:
+        raise RuntimeError("MODEL_NAME or MODEL_NAMES is required")
+
+    models, versions = {}, {}
+    for model_name in model_names:
+        try:
+            versions[model_name], models[model_name] = store.load_startup(model_name)
+        except Exception:
+            if len(model_names) == 1:
+                raise
+            logger.exception(f"Could not load {model_name}, leaving it out")
+            continue
+        logger.info(f"Model {model_name} version {versions[model_name]} loaded")
+
+    if not models:
+        raise RuntimeError("None of the models could be loaded")
+    return models, versions
+
+async def predict(job: PredictionJob, batcher: MicroBatcher, writer: ResultWriter):
+    # Perform Inference; the blocking calls run on worker threads so the jobs' I/O overlaps
+    X = await asyncio.to_thread(get_input_data, job.machine_name)
+    prediction = await batcher.predict(X)
+    prediction_value = int(np.asarray(prediction).ravel()[0])
+    # Stored by the writer in the background, batched with the results of other jobs
+    await writer.submit(job.machine_name, prediction_value)
+
+    logger.info(f"{job.model_name} Prediction for {job.machine_name}: {prediction}")
+
+async def main():
+    store = ModelStore(MODEL_CACHE_DIR, MODEL_CACHE_KEEP, compile_trees=TREE_ENGINE == "compiled")
+    models, versions = load_models(store, list(dict.fromkeys(model_name for model_name, _ in PREDICTION_JOBS)))
+    jobs = [
+        PredictionJob(model_name, machine_name, models[model_name])
+        for model_name, machine_name in PREDICTION_JOBS
+        if model_name in models
+    ]
+    concurrency = min(MAX_CONCURRENT_PREDICTIONS, len(jobs))
+
+    # One thread per prediction in flight, which only ever waits on one blocking call at a time,
+    # plus one for the writer and one for the model reloader
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency + 2, thread_name_prefix="predict"))
+
+    stats = PredictionStats(PREDICTION_INTERVAL, jobs=len(jobs), slots=concurrency)
+    serve_stats(stats)
+
+    writer = ResultWriter(
+        add_inference_results,
+        batch_size=WRITE_BATCH_SIZE,
+        flush_interval=WRITE_FLUSH_INTERVAL_MS / 1000,
+        buffer_size=WRITE_BUFFER_SIZE,
+        overflow_policy=WRITE_OVERFLOW_POLICY,
+        max_retries=WRITE_MAX_RETRIES,
+        stats=stats,
+    )
+    writer.start()
+
+    # The jobs of one model share its batcher, so their rows go through one predict call. A batch
+    # can't outgrow the model's jobs or the predictions in flight, so it is sent once it holds
+    # that many rows instead of waiting out MAX_BATCH_WAIT_MS; a model with one job isn't batched.
+    job_counts = Counter(job.model_name for job in jobs)
+    batchers = {
+        model_name: MicroBatcher(
+            model_name,
+            model,
+            min(MAX_BATCH_SIZE, job_counts[model_name], concurrency),
+            MAX_BATCH_WAIT_MS / 1000,
+        )
+        for model_name, model in models.items()
+    }
+
+    scheduler = PredictionScheduler(
+        jobs,
+        PREDICTION_INTERVAL,
+        lambda job: predict(job, batchers[job.model_name], writer),
+        concurrency,
+        stats,
+    )
+    reloader = ModelReloader(store, batchers, versions, MODEL_POLL_INTERVAL)
+    reloader_task = asyncio.create_task(reloader.run())
+    scheduler_task = asyncio.create_task(scheduler.run())
+    # Kubernetes sends SIGTERM before killing the pod; stop predicting and flush what is buffered
+    loop.add_signal_handler(signal.SIGTERM, scheduler_task.cancel)
+    try:
+        await scheduler_task
+    except asyncio.CancelledError:
+        logger.info("Stopping predictions")
+    finally:
+        reloader_task.cancel()
+        await writer.close(WRITE_SHUTDOWN_TIMEOUT)
+        pool.close()
+
+asyncio.run(main())
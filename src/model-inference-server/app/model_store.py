@@ -0,0 +1,242 @@
+import os
+import uuid
+import random
+import shutil
+import asyncio
+import hashlib
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Any
+from app.logging_setup import logging_setup
+from app.tree_engine import CompiledTree, compile_model
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+COMPILED_FILE = "compiled.npz"
+
+def content_hash(directory: Path) -> str:
+    """SHA-256 over the relative path and bytes of every file below a directory."""
+    digest = hashlib.sha256()
+    for path in sorted(p for p in directory.rglob("*") if p.is_file()):
+        digest.update(path.relative_to(directory).as_posix().encode())
+        digest.update(b"\0")
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+class ModelStore:
+    """
+    Content-addressed on-disk cache of MLflow model artifacts.
+
+    Artifacts live in objects/<sha256 of their files>/ and refs/<model>/<version> names the
+    object of each model version, so a restart loads a known version from disk and identical
+    artifacts registered twice are stored once. Next to the artifact, an object keeps the
+    compiled tree of the model, which then loads without unpickling sklearn at all. Every
+    write lands in tmp/ first and is renamed into place, so a crash never leaves a partial
+    entry behind.
+
+    mlflow is only imported once the store has to talk to MLflow or unpickle a model, as
+    importing it takes seconds; a start from a cached compiled tree never does.
+    """
+
+    def __init__(self, cache_dir: str, keep_versions: int, compile_trees: bool):
+        self.root = Path(cache_dir)
+        self.keep_versions = keep_versions
+        self.compile_trees = compile_trees
+        self.client = None
+        for directory in ("objects", "refs", "tmp"):
+            (self.root / directory).mkdir(parents=True, exist_ok=True)
+
+    def mlflow_client(self):
+        if self.client is None:
+            from mlflow.tracking import MlflowClient
+            self.client = MlflowClient()
+        return self.client
+
+    def latest_version(self, model_name: str) -> int | None:
+        """
+        Ask MLflow for the newest version of a registered model.
+
+        Returns:
+            int | None: The version number, or None if the model has no versions.
+        """
+        versions = self.mlflow_client().search_model_versions(
+            f"name = '{model_name}'",
+            max_results=1,
+            order_by=["version_number DESC"],
+        )
+        return int(versions[0].version) if versions else None
+
+    def cached_versions(self, model_name: str) -> list[int]:
+        refs = self.root / "refs" / model_name
+        if not refs.is_dir():
+            return []
+        return sorted((int(ref.name) for ref in refs.iterdir() if ref.name.isdigit()), reverse=True)
+
+    def fetch(self, model_name: str, version: int) -> Path:
+        """
+        Find a model version on disk, downloading it from MLflow only if it isn't cached yet.
+
+        Returns:
+            Path: Directory of the model artifact.
+        """
+        ref = self.root / "refs" / model_name / str(version)
+        if ref.is_file():
+            path = self.root / "objects" / ref.read_text().strip()
+            if path.is_dir():
+                return path
+
+        import mlflow
+        staging = self.root / "tmp" / uuid.uuid4().hex
+        try:
+            local = Path(mlflow.artifacts.download_artifacts(
+                artifact_uri=f"models:/{model_name}/{version}",
+                dst_path=str(staging),
+            ))
+            digest = content_hash(local)
+            path = self.root / "objects" / digest
+            if not path.exists():
+                os.rename(local, path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        ref.parent.mkdir(parents=True, exist_ok=True)
+        staged_ref = self.root / "tmp" / f"{uuid.uuid4().hex}.ref"
+        staged_ref.write_text(digest)
+        os.replace(staged_ref, ref)
+        logger.info(f"Cached {model_name} version {version} as {digest[:12]}")
+
+        self.prune(model_name)
+        return path
+
+    def prune(self, model_name: str):
+        """Forget all but the newest keep_versions versions of a model and delete objects nothing refers to."""
+        refs = self.root / "refs" / model_name
+        for version in self.cached_versions(model_name)[self.keep_versions:]:
+            (refs / str(version)).unlink(missing_ok=True)
+
+        referenced = {ref.read_text().strip() for ref in (self.root / "refs").glob("*/*")}
+        for path in (self.root / "objects").iterdir():
+            if path.name not in referenced:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def load(self, model_name: str, version: int) -> Any:
+        """
+        Load a model version from the cache, compiled to a flat-array tree where possible.
+
+        Returns:
+            A CompiledTree or the sklearn model.
+        """
+        path = self.fetch(model_name, version)
+        compiled_path = path / COMPILED_FILE
+        if self.compile_trees and compiled_path.is_file():
+            return CompiledTree.load(str(compiled_path))
+
+        import mlflow
+        model = mlflow.sklearn.load_model(str(path))
+        if not self.compile_trees:
+            return model
+
+        model = compile_model(model_name, model)
+        if isinstance(model, CompiledTree):
+            staged = self.root / "tmp" / f"{uuid.uuid4().hex}.npz"
+            try:
+                model.save(str(staged))
+                os.replace(staged, compiled_path)
+            except (OSError, ValueError) as exc:
+                staged.unlink(missing_ok=True)
+                logger.info(f"Not caching the compiled tree of {model_name}: {exc}")
+        return model
+
+    def load_latest(self, model_name: str) -> tuple[int, Any]:
+        """
+        Load the newest version of a model, or the newest cached one while MLflow can't be reached.
+
+        Returns:
+            tuple: The version number and the loaded model.
+        """
+        try:
+            version = self.latest_version(model_name)
+        except Exception as exc:
+            cached = self.cached_versions(model_name)
+            if not cached:
+                raise
+            version = cached[0]
+            logger.warning(f"MLflow unavailable ({exc!r}), starting {model_name} from cached version {version}")
+        if version is None:
+            raise RuntimeError(f"{model_name} has no registered versions")
+        return version, self.load(model_name, version)
+
+    def load_startup(self, model_name: str) -> tuple[int, Any]:
+        """
+        Load a model for startup: the newest cached version without asking MLflow, or the latest
+        version from MLflow when nothing is cached. ModelReloader catches up with anything newer.
+
+        Returns:
+            tuple: The version number and the loaded model.
+        """
+        cached = self.cached_versions(model_name)
+        if cached:
+            try:
+                return cached[0], self.load(model_name, cached[0])
+            except Exception:
+                logger.exception(f"Could not load cached version {cached[0]} of {model_name}, asking MLflow")
+        return self.load_latest(model_name)
+
+def warm_up(model: Any, row) -> None:
+    """
+    Run one prediction the way the prediction loop does, so a model that can't serve never goes live.
+
+    Args:
+        model: A CompiledTree or sklearn model.
+        row: Recent input of the model, or None to predict zeros.
+    """
+    if row is None:
+        n_features = getattr(model, "n_features", None) or getattr(model, "n_features_in_", None)
+        if n_features is None:
+            return
+        row = np.zeros(n_features)
+    prediction = model.predict(np.asarray(row).reshape(1, -1))
+    int(np.asarray(prediction).ravel()[0])
+
+class ModelReloader:
+    """
+    Polls MLflow for new latest versions of the served models and swaps them in without a restart.
+    The first poll runs straight away, so a server started from its cache catches up within seconds.
+
+    A new version is downloaded, loaded and warmed up on a worker thread while the current
+    one keeps serving; only once it predicted successfully does the batcher switch to it, in
+    a single assignment on the event loop. Poll times are jittered so pods don't hit MLflow
+    in lockstep.
+    """
+
+    def __init__(self, store: ModelStore, batchers: dict, versions: dict[str, int], interval: float):
+        self.store = store
+        self.batchers = batchers
+        self.versions = versions
+        self.interval = interval
+
+    async def run(self):
+        while True:
+            for model_name in self.batchers:
+                try:
+                    await self.reload(model_name)
+                except Exception:
+                    logger.exception(f"Could not reload {model_name}, keeping version {self.versions[model_name]}")
+            await asyncio.sleep(self.interval * random.uniform(0.8, 1.2))
+
+    async def reload(self, model_name: str):
+        latest = await asyncio.to_thread(self.store.latest_version, model_name)
+        if latest is None or latest <= self.versions[model_name]:
+            return
+
+        batcher = self.batchers[model_name]
+        model = await asyncio.to_thread(self.store.load, model_name, latest)
+        await asyncio.to_thread(warm_up, model, batcher.last_row)
+
+        batcher.model = model
+        logger.info(f"Switched {model_name} from version {self.versions[model_name]} to {latest}")
+        self.versions[model_name] = latest
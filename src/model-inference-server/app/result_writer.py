@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from typing import Callable
+from app.logging_setup import logging_setup
+from app.stats import PredictionStats
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop")
+MAX_RETRY_DELAY = 5.0
+
+class ResultWriter:
+    """
+    Write-behind buffer that takes inference results off the prediction path.
+
+    Results of every job are queued in memory and written as one multi-row INSERT once
+    batch_size of them are waiting or the oldest has waited flush_interval seconds. At most
+    buffer_size results are held: when MariaDB falls behind, the "block" policy makes
+    predictions wait for room and the "drop" policy discards the oldest buffered result.
+    A batch that keeps failing is dropped after max_retries attempts.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[list[tuple[str, int]]], int],
+        batch_size: int,
+        flush_interval: float,
+        buffer_size: int,
+        overflow_policy: str,
+        max_retries: int,
+        stats: PredictionStats,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"WRITE_OVERFLOW_POLICY must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.max_retries = max_retries
+        self.stats = stats
+        self.queue: asyncio.Queue[tuple[str, int]] = asyncio.Queue(maxsize=buffer_size)
+        self.task = None
+        # The batch being collected, kept here so close() can still write it
+        self.batch: list[tuple[str, int]] = []
+        self.flushing = None
+
+    async def submit(self, machine_name: str, inference_result: int):
+        """
+        Buffer one inference result.
+
+        Args:
+            machine_name (str): Machine the result belongs to.
+            inference_result (int): Predicted value.
+        """
+        if self.overflow_policy == "block":
+            await self.queue.put((machine_name, inference_result))
+            return
+
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.stats.record_dropped(1)
+        self.queue.put_nowait((machine_name, inference_result))
+
+    def take(self, batch: list):
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def flush(self, batch: list[tuple[str, int]]):
+        delay = self.flush_interval
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                written = await asyncio.to_thread(self.write, batch)
+                logger.debug(f"Wrote {written} of {len(batch)} inference results")
+                return
+            except Exception as exc:
+                if attempt == self.max_retries:
+                    logger.error(f"Dropping {len(batch)} inference results after {attempt} failed writes: {exc!r}")
+                    self.stats.record_dropped(len(batch))
+                    return
+                logger.warning(f"Writing {len(batch)} inference results failed, retrying in {delay:.1f}s: {exc!r}")
+                await asyncio.sleep(delay)
+                delay = min(MAX_RETRY_DELAY, delay * 2)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.batch.append(await self.queue.get())
+            flush_at = loop.time() + self.flush_interval
+            self.take(self.batch)
+            while len(self.batch) < self.batch_size and (remaining := flush_at - loop.time()) > 0:
+                try:
+                    self.batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except TimeoutError:
+                    break
+                self.take(self.batch)
+
+            batch, self.batch = self.batch, []
+            # Shielded so that stopping the writer never abandons a batch halfway
+            self.flushing = asyncio.ensure_future(self.flush(batch))
+            await asyncio.shield(self.flushing)
+            self.flushing = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def close(self, timeout: float):
+        """
+        Stop the writer and flush everything still buffered, e.g. on SIGTERM.
+
+        Args:
+            timeout (float): Seconds to spend flushing before giving up on the rest.
+        """
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        try:
+            async with asyncio.timeout(timeout):
+                if self.flushing is not None:
+                    await self.flushing
+                while self.batch or not self.queue.empty():
+                    batch, self.batch = self.batch, []
+                    self.take(batch)
+                    await self.flush(batch)
+        except TimeoutError:
+            left = len(self.batch) + self.queue.qsize()
+            logger.error(f"Gave up flushing {left} inference results on shutdown")
+            self.stats.record_dropped(left)
+            return
+        logger.info("Flushed buffered inference results")
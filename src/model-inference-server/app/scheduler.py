@@ -0,0 +1,75 @@
+import math
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from app.logging_setup import logging_setup
+from app.stats import PredictionStats
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class PredictionJob:
+    model_name: str
+    machine_name: str
+    model: Any
+
+class PredictionScheduler:
+    """
+    Runs every job on a fixed-rate clock: the n-th prediction of a job is due at
+    start + offset + n * interval, however long the previous ones took, so fetch and
+    write latency never add up to drift. Models are spread over one interval so they don't
+    all fire together, while the jobs of one model share an offset so their predictions can
+    be batched. At most max_concurrency predictions are in flight.
+
+    A job that is still busy when its next prediction is due has missed that deadline.
+    It runs once straight away, skips any further ticks it is behind by, and the misses
+    are logged and counted in the stats.
+    """
+
+    def __init__(
+        self,
+        jobs: list[PredictionJob],
+        interval: float,
+        run_job: Callable[[PredictionJob], Awaitable[None]],
+        max_concurrency: int,
+        stats: PredictionStats,
+    ):
+        self.jobs = jobs
+        self.interval = interval
+        self.run_job = run_job
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = stats
+
+    async def run(self):
+        models = list(dict.fromkeys(job.model_name for job in self.jobs))
+        await asyncio.gather(*(
+            self.drive(job, models.index(job.model_name) * self.interval / len(models))
+            for job in self.jobs
+        ))
+
+    async def drive(self, job: PredictionJob, offset: float):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + offset
+        while True:
+            await asyncio.sleep(deadline - loop.time())
+            async with self.semaphore:
+                started = loop.time()
+                try:
+                    await self.run_job(job)
+                except Exception:
+                    logger.exception(f"Prediction failed for {job.model_name} on {job.machine_name}")
+                finished = loop.time()
+            self.stats.record(finished - started, started - deadline)
+
+            deadline += self.interval
+            behind = finished - deadline
+            if behind > 0:
+                skipped = math.floor(behind / self.interval)
+                deadline += skipped * self.interval
+                self.stats.record_missed(skipped + 1)
+                logger.warning(
+                    f"{job.model_name} on {job.machine_name} missed {skipped + 1} deadline(s), "
+                    f"{behind:.2f}s behind its {self.interval}s interval"
+                )
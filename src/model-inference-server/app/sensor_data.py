@@ -1,9 +1,9 @@
 import requests
 from app.constants import SENSOR_DATA_ENDPOINT, MODEL_NAME
 
-def get_input_data():
+def get_input_data(machine_name: str = MODEL_NAME):
     """Return real-time data from sensor-data microservice"""
-    raw_input_data = requests.get(SENSOR_DATA_ENDPOINT, params={"name": MODEL_NAME})
+    raw_input_data = requests.get(SENSOR_DATA_ENDPOINT, params={"name": machine_name})
     input = raw_input_data.json()["data"]
     input_array = list(input.values())[:-1]
 
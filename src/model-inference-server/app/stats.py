@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.logging_setup import logging_setup
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+STATS_PORT = int(os.getenv("STATS_PORT", "80"))
+# Weight of the newest prediction in the moving averages
+EWMA_ALPHA = 0.2
+
+class PredictionStats:
+    """Load signals of this replica, read by the inference gateway's autoscaler."""
+
+    def __init__(self, interval: float, jobs: int = 1, slots: int = 1):
+        """
+        Args:
+            interval (float): Seconds between two predictions of one job.
+            jobs (int): Prediction jobs run by this process.
+            slots (int): Predictions allowed in flight at once.
+        """
+        self.interval = interval
+        self.jobs = jobs
+        self.slots = slots
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.predictions = 0
+        self.missed_deadlines = 0
+        self.dropped_results = 0
+        self.work_seconds = 0.0
+        self.lag_seconds = 0.0
+
+    def record(self, work_seconds: float, lateness_seconds: float):
+        """
+        Record one prediction.
+
+        Args:
+            work_seconds (float): Time spent fetching input, predicting and storing the result.
+            lateness_seconds (float): How long after its deadline the prediction started.
+        """
+        with self.lock:
+            self.work_seconds += EWMA_ALPHA * (work_seconds - self.work_seconds)
+            self.lag_seconds += EWMA_ALPHA * (max(0.0, lateness_seconds) - self.lag_seconds)
+            self.predictions += 1
+
+    def record_missed(self, count: int):
+        with self.lock:
+            self.missed_deadlines += count
+
+    def record_dropped(self, count: int):
+        with self.lock:
+            self.dropped_results += count
+
+    def snapshot(self) -> dict:
+        uptime = time.monotonic() - self.started_at
+        with self.lock:
+            # Share of the in-flight slots that the jobs keep busy at their interval
+            utilization = self.work_seconds * self.jobs / (self.interval * self.slots)
+            return {
+                "predictions": self.predictions,
+                "missed_deadlines": self.missed_deadlines,
+                "dropped_results": self.dropped_results,
+                "utilization": round(utilization, 4),
+                "lag_seconds": round(self.lag_seconds, 4),
+                "predictions_per_second": round(self.predictions / uptime, 4) if uptime else 0.0,
+                "cpu_seconds": round(time.process_time(), 3),
+                "uptime_seconds": round(uptime, 3),
+                "prediction_interval": self.interval,
+            }
+
+def serve_stats(stats: PredictionStats, port: int = STATS_PORT) -> ThreadingHTTPServer:
+    """
+    Serve GET /stats as JSON from a daemon thread, next to the prediction loop.
+
+    Args:
+        stats (PredictionStats): Stats of this replica.
+        port (int): Port to listen on.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/stats":
+                self.send_error(404)
+                return
+            body = json.dumps(stats.snapshot()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), StatsHandler)
+    threading.Thread(target=server.serve_forever, name="stats", daemon=True).start()
+    logger.info(f"Serving stats on port {port}")
+    return server
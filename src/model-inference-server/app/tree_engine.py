@@ -0,0 +1,186 @@
+import logging
+import warnings
+import numpy as np
+from dataclasses import dataclass
+from typing import Any
+from app.logging_setup import logging_setup
+
+logging_setup()
+logger = logging.getLogger(__name__)
+
+# Rows compared against sklearn before a compiled tree is trusted
+PARITY_SAMPLES = 512
+LEAF = -1
+
+@dataclass(frozen=True)
+class CompiledTree:
+    """
+    A fitted decision tree flattened into NumPy node arrays, evaluated for a whole batch
+    at once by moving every row one level down per step instead of walking node objects.
+
+    Node i splits on feature[i] at threshold[i] and continues at left[i] or right[i];
+    leaves have left[i] == right[i] == -1 and predict value[i]. classes is set for
+    classifiers, whose value holds the index of the winning class.
+    """
+
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    value: np.ndarray
+    depth: int
+    n_features: int
+    classes: np.ndarray | None = None
+
+    def predict(self, X) -> np.ndarray:
+        # sklearn compares float32 inputs against float64 thresholds, so rounding has to match
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        # Like sklearn, refuse rows of the wrong width rather than reflowing them into other rows
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected rows of {self.n_features} features, got input of shape {X.shape}")
+        rows = np.arange(X.shape[0])
+        node = np.zeros(X.shape[0], dtype=np.intp)
+        for _ in range(self.depth):
+            at_leaf = self.left[node] == LEAF
+            if at_leaf.all():
+                break
+            goes_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(at_leaf, node, np.where(goes_left, self.left[node], self.right[node]))
+
+        prediction = self.value[node]
+        return prediction if self.classes is None else self.classes[prediction]
+
+    def save(self, path: str):
+        """
+        Store the node arrays so a restart can skip unpickling and checking the sklearn model.
+
+        Raises:
+            ValueError: If the class labels can only be stored pickled.
+        """
+        arrays = dict(
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            shape=np.array([self.depth, self.n_features]),
+        )
+        if self.classes is not None:
+            arrays["classes"] = self.classes
+        with open(path, "wb") as file:
+            np.savez(file, allow_pickle=False, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledTree":
+        with np.load(path, allow_pickle=False) as arrays:
+            depth, n_features = (int(size) for size in arrays["shape"])
+            return cls(
+                feature=arrays["feature"],
+                threshold=arrays["threshold"],
+                left=arrays["left"],
+                right=arrays["right"],
+                value=arrays["value"],
+                depth=depth,
+                n_features=n_features,
+                classes=arrays["classes"] if "classes" in arrays else None,
+            )
+
+def final_estimator(model: Any) -> Any | None:
+    """
+    Find the tree a model predicts with, looking through pipelines whose other steps do nothing.
+
+    Args:
+        model: A fitted sklearn estimator or Pipeline.
+
+    Returns:
+        The final estimator, or None if a pipeline step transforms the input.
+    """
+    steps = getattr(model, "steps", None)
+    if steps is None:
+        return model
+    transforms = [step for _, step in steps[:-1]]
+    if any(step not in (None, "passthrough") for step in transforms):
+        return None
+    return steps[-1][1]
+
+def compile_tree(estimator: Any) -> CompiledTree | None:
+    """
+    Flatten a fitted single-output DecisionTreeRegressor or DecisionTreeClassifier.
+
+    Args:
+        estimator: A fitted sklearn estimator.
+
+    Returns:
+        CompiledTree | None: The compiled tree, or None if the estimator isn't supported.
+    """
+    tree = getattr(estimator, "tree_", None)
+    kind = type(estimator).__name__
+    if tree is None or kind not in ("DecisionTreeRegressor", "DecisionTreeClassifier") or estimator.n_outputs_ != 1:
+        return None
+
+    feature = tree.feature.astype(np.intp)
+    left = tree.children_left.astype(np.intp)
+    # Leaves carry a negative placeholder feature; any valid column keeps the gather in bounds
+    feature[left == LEAF] = 0
+    common = dict(
+        feature=feature,
+        threshold=tree.threshold.astype(np.float64),
+        left=left,
+        right=tree.children_right.astype(np.intp),
+        depth=int(tree.max_depth),
+        n_features=int(estimator.n_features_in_),
+    )
+    if kind == "DecisionTreeClassifier":
+        return CompiledTree(value=tree.value[:, 0, :].argmax(axis=1), classes=np.asarray(estimator.classes_), **common)
+    return CompiledTree(value=tree.value[:, 0, 0].copy(), **common)
+
+def parity_inputs(compiled: CompiledTree, samples: int = PARITY_SAMPLES) -> np.ndarray:
+    """Rows that land on both sides of, and exactly on, the split thresholds."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(samples, compiled.n_features))
+    splits = compiled.left != LEAF
+    for column in range(compiled.n_features):
+        thresholds = compiled.threshold[splits & (compiled.feature == column)]
+        if thresholds.size:
+            picked = rng.choice(thresholds, size=samples)
+            X[:, column] = picked + rng.choice([-1e-3, 0.0, 1e-3], size=samples) * np.maximum(1.0, np.abs(picked))
+    return X
+
+def compile_model(model_name: str, model: Any) -> Any:
+    """
+    Swap a fitted tree model for its compiled form when it predicts exactly the same.
+
+    Args:
+        model_name (str): Name of the model, for logging.
+        model: The sklearn model loaded from MLflow.
+
+    Returns:
+        A CompiledTree, or the sklearn model itself if it isn't a supported tree or the
+        compiled tree disagrees with it.
+    """
+    estimator = final_estimator(model)
+    compiled = compile_tree(estimator) if estimator is not None else None
+    if compiled is None:
+        logger.info(f"{model_name} is not a plain decision tree, predicting with sklearn")
+        return model
+
+    X = parity_inputs(compiled)
+    try:
+        with warnings.catch_warnings():
+            # Probe rows carry no feature names, unlike the DataFrame the model was fitted on
+            warnings.simplefilter("ignore", UserWarning)
+            expected = np.asarray(estimator.predict(X))
+    except Exception:
+        logger.exception(f"Could not check the compiled tree of {model_name}, predicting with sklearn")
+        return model
+
+    actual = compiled.predict(X)
+    matches = np.array_equal(actual, expected) if compiled.classes is not None else np.allclose(actual, expected)
+    if not matches:
+        logger.warning(f"Compiled tree of {model_name} disagrees with sklearn, predicting with sklearn")
+        return model
+
+    logger.info(f"Compiled {model_name} into {compiled.left.size} nodes of depth {compiled.depth}")
+    return compiled
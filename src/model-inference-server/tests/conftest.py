@@ -0,0 +1,4 @@
+import os
+
+# app.constants reads it at import time; the deployment templates always set it
+os.environ.setdefault("PREDICTION_INTERVAL", "5")
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+from app.tree_engine import compile_tree
+
+def fitted(estimator, n_features=4):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, n_features))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    return estimator.fit(X, y), X
+
+@pytest.mark.parametrize("estimator", [DecisionTreeRegressor(max_depth=4), DecisionTreeClassifier(max_depth=4)])
+def test_predicts_like_sklearn(estimator):
+    estimator, X = fitted(estimator)
+    compiled = compile_tree(estimator)
+
+    np.testing.assert_array_equal(compiled.predict(X), estimator.predict(X))
+    np.testing.assert_array_equal(compiled.predict(X[0]), estimator.predict(X[:1]))
+
+@pytest.mark.parametrize("rows", [np.zeros(8), np.zeros((1, 8)), np.zeros((2, 3)), np.zeros((1, 2, 4))])
+def test_rejects_rows_of_the_wrong_width(rows):
+    estimator, _ = fitted(DecisionTreeRegressor(max_depth=4))
+    compiled = compile_tree(estimator)
+
+    # An 8-feature row must not be read as two 4-feature rows
+    with pytest.raises(ValueError):
+        compiled.predict(rows)